@@ -1,47 +1,117 @@
 from abc import ABC, abstractmethod
-from langchain_ollama import OllamaLLM
-from langchain_groq import ChatGroq
+import asyncio
+from typing import Optional, Tuple
 from langchain.schema.messages import HumanMessage
+from utils import metrics
 from utils.config import Config
-import sys
+from utils.llm_cache import llm_cache, replay
+from utils.llm_pool import get_llm, resolve_settings
 
 class BaseAgent(ABC):
     def __init__(self, name: str, callbacks=None):
         self.name = name
         self.callbacks = callbacks or []
-        self.llm = self._initialize_llm()
         
-    def _initialize_llm(self):
+    @property
+    def llm(self):
+        """Shared client for the configured provider, created on first use"""
+        return get_llm()
+        
+    def _call_llm(self, prompt: str, callbacks=None, prompt_type: Optional[str] = None) -> str:
+        """Invoke LLM with the agent's callbacks plus any per-call callbacks
+
+        Responses are cached per prompt type; a cache hit is replayed through
+        the streaming callbacks so callers see the same token stream.
+        """
+        all_callbacks, key, ttl = self._prepare_call(prompt, callbacks, prompt_type)
+        cached = self._cached_response(key, all_callbacks)
+        if cached is not None:
+            return cached
+        
+        response = self._content(self.llm.invoke(self._llm_input(prompt), config={"callbacks": all_callbacks}))
+        self._store_response(key, response, ttl)
+        return response
+        
+    async def _acall_llm(self, prompt: str, callbacks=None, prompt_type: Optional[str] = None) -> str:
+        """Async variant of _call_llm sharing the same response cache"""
+        all_callbacks, key, ttl = self._prepare_call(prompt, callbacks, prompt_type)
+        # The cache is SQLite; keep its reads and commits off the event loop
+        cached = await asyncio.to_thread(self._cached_response, key, all_callbacks)
+        if cached is not None:
+            return cached
+        
+        response = self._content(await self.llm.ainvoke(self._llm_input(prompt), config={"callbacks": all_callbacks}))
+        await asyncio.to_thread(self._store_response, key, response, ttl)
+        return response
+        
+    def _prepare_call(self, prompt: str, callbacks, prompt_type: Optional[str]) -> Tuple[list, Optional[str], Optional[float]]:
+        """Callbacks for a call, and its cache key and TTL (both None when it is not cached)"""
+        all_callbacks = self._collect_callbacks(callbacks, prompt_type)
+        ttl = llm_cache.ttl_for(prompt_type or self.name) if Config.llm_cache_config.enabled else None
+        if ttl is None:
+            return all_callbacks, None, None
+        return all_callbacks, llm_cache.make_key(*resolve_settings(), prompt), ttl
+        
+    def _cached_response(self, key: Optional[str], callbacks: list) -> Optional[str]:
+        """A cached response, replayed through the callbacks, or None on a miss"""
+        if key is None:
+            return None
+        cached = llm_cache.get(key)
+        if cached is not None:
+            replay(cached, callbacks)
+        return cached
+        
+    def _store_response(self, key: Optional[str], response: str, ttl: Optional[float]) -> None:
+        if key is not None:
+            llm_cache.set(key, response, ttl)
+        
+    def _llm_input(self, prompt: str):
+        """Chat models (Groq) take messages; the others take the prompt as is"""
         if Config.model_config.provider == "groq":
-            return ChatGroq(
-                api_key=Config.model_config.groq_api_key,
-                model_name=Config.model_config.groq_model_name,
-                callbacks=self.callbacks,
-                streaming=True
-            )
-        elif Config.model_config.provider == "ollama":
-            return OllamaLLM(
-                model=Config.model_config.model_name,
-                callbacks=self.callbacks
-            )
-        else:
-            raise ValueError(f"Unknown provider: {Config.model_config.provider}")
-        
-    def _invoke_llm(self, prompt: str) -> str:
+            return [HumanMessage(content=prompt)]
+        return prompt
+        
+    def _content(self, result) -> str:
+        return result.content if Config.model_config.provider == "groq" else result
+        
+    def _collect_callbacks(self, callbacks, prompt_type: Optional[str]) -> list:
+        """Agent callbacks, per-call callbacks and the request's metrics handler"""
+        all_callbacks = self.callbacks + list(callbacks or [])
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            all_callbacks.append(metrics.MetricsHandler(request_metrics, prompt_type or self.name))
+        return all_callbacks
+        
+    def _invoke_llm(self, prompt: str, callbacks=None, prompt_type: Optional[str] = None) -> str:
         """Invoke LLM with consistent callbacks"""
         try:
-            if Config.model_config.provider == "groq":
-                response = self.llm.invoke(
-                    [HumanMessage(content=prompt)]
-                )
-                return response.content
-            else:
-                return self.llm.invoke(prompt)
+            return self._call_llm(prompt, callbacks, prompt_type)
             
         except Exception as e:
-            print(f"\nError invoking LLM: {str(e)}")
-            return f"Error: {str(e)}"
+            return self._llm_error(e, prompt_type)
+            
+    async def _ainvoke_llm(self, prompt: str, callbacks=None, prompt_type: Optional[str] = None) -> str:
+        """Async variant of _invoke_llm"""
+        try:
+            return await self._acall_llm(prompt, callbacks, prompt_type)
+            
+        except Exception as e:
+            return self._llm_error(e, prompt_type)
+            
+    def _llm_error(self, error: Exception, prompt_type: Optional[str]) -> str:
+        """Report a failed call as text; the request's metrics count it so callers can tell"""
+        metrics.incr(f"llm.error.{prompt_type or self.name}")
+        print(f"\nError invoking LLM: {str(error)}")
+        return f"Error: {str(error)}"
+    
+    def prefetch(self, query: str) -> None:
+        """Start speculative tool I/O for a query before routing finishes"""
+        pass
     
     @abstractmethod
     def process(self, query: str) -> str:
-        pass
\ No newline at end of file
+        pass
+        
+    async def aprocess(self, query: str) -> str:
+        """Async variant of process; runs the sync path in a thread unless overridden"""
+        return await asyncio.to_thread(self.process, query)
\ No newline at end of file
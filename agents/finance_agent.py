@@ -1,9 +1,15 @@
 from agents.base_agent import BaseAgent
 from tools.finance_tools import VantageFinanceTool
+from tools.indicators import compute_indicators
+from tools.symbol_index import get_symbol_index
 from utils.prompts import FINANCE_AGENT_PROMPT, SYMBOL_EXTRACTION_PROMPT
+from utils import metrics
+from utils.speculation import speculator
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import asyncio
 import json
 import re
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 class FinanceAgent(BaseAgent):
     def __init__(self, callbacks=None):
@@ -19,12 +25,10 @@ class FinanceAgent(BaseAgent):
         """Process financial queries with comprehensive analysis"""
         try:
             symbols = self._extract_symbols(query)
-            market_data = {symbol: self.finance_tool.get_stock_data(symbol) for symbol in symbols}
-            
-            prompt = self.prompt.format(
-                market_data=json.dumps(market_data, indent=2),
-                query=query
-            )
+            market_data = self._get_market_data(symbols)
+            # Histories go second so their requests never take rate budget the quotes need
+            histories = self._wait_histories(self.finance_tool.submit_histories(symbols))
+            prompt = self._build_prompt(query, market_data, self._format_indicators(histories))
             
             # Use streaming invoke
             return self._invoke_llm(prompt)
@@ -32,39 +36,158 @@ class FinanceAgent(BaseAgent):
         except Exception as e:
             return self._format_error_response(str(e))
             
+    async def aprocess(self, query: str) -> str:
+        """Async variant of process"""
+        try:
+            symbols = await self._aextract_symbols(query)
+            market_data = await self._aget_market_data(symbols)
+            histories = await self._aget_histories(symbols)
+            # Indicators read the memory-mapped price files
+            indicators = await asyncio.to_thread(self._format_indicators, histories)
+            return await self._ainvoke_llm(self._build_prompt(query, market_data, indicators))
+            
+        except Exception as e:
+            return self._format_error_response(str(e))
+            
+    def _build_prompt(self, query: str, market_data: Dict[str, dict], indicators: str) -> str:
+        return self.prompt.format(
+            market_data=json.dumps(market_data, indent=2),
+            indicators=indicators,
+            query=query
+        )
+            
+    def prefetch(self, query: str) -> None:
+        """Start fetching confidently identified symbols while the planner is still deciding"""
+        symbols, _ = self._candidate_symbols(query)
+        for symbol in symbols:
+            if self._is_valid_symbol_format(symbol):
+                speculator.submit(("finance", symbol), self.finance_tool.get_stock_data, symbol)
+                
+    def _get_market_data(self, symbols: List[str]) -> Dict[str, dict]:
+        """Use prefetched results where they exist and fetch the rest concurrently"""
+        market_data = {}
+        for symbol in symbols:
+            prefetched = speculator.claim(("finance", symbol))
+            if prefetched is not None:
+                market_data[symbol] = prefetched
+        results, errors = self.finance_tool.get_many([s for s in symbols if s not in market_data])
+        return self._merge_errors(symbols, {**market_data, **results}, errors)
+        
+    async def _aget_market_data(self, symbols: List[str]) -> Dict[str, dict]:
+        """Async variant of _get_market_data"""
+        claimed = await asyncio.gather(*(speculator.aclaim(("finance", symbol)) for symbol in symbols))
+        market_data = {symbol: data for symbol, data in zip(symbols, claimed) if data is not None}
+        results, errors = await self.finance_tool.aget_many([s for s in symbols if s not in market_data])
+        return self._merge_errors(symbols, {**market_data, **results}, errors)
+        
+    def _merge_errors(self, symbols: List[str], market_data: Dict[str, dict], errors: Dict[str, str]) -> Dict[str, dict]:
+        """Keep partial results, noting failed symbols; raise only if nothing was fetched"""
+        if errors and not market_data:
+            raise Exception("; ".join(errors.values()))
+        return {
+            symbol: market_data[symbol] if symbol in market_data else {"error": errors[symbol]}
+            for symbol in symbols
+            if symbol in market_data or symbol in errors
+        }
+            
+    def _wait_histories(self, histories: Future) -> Dict:
+        """Histories from a background load, or none if it overruns the history timeout"""
+        try:
+            return histories.result(timeout=self.finance_tool.history_timeout)
+        except FutureTimeoutError:
+            return self._histories_timed_out()
+
+    async def _aget_histories(self, symbols: List[str]) -> Dict:
+        """Async variant of _wait_histories"""
+        try:
+            return await asyncio.wait_for(self.finance_tool.aget_histories(symbols), self.finance_tool.history_timeout)
+        except asyncio.TimeoutError:
+            return self._histories_timed_out()
+
+    def _histories_timed_out(self) -> Dict:
+        """Answer without indicators rather than wait any longer"""
+        metrics.incr("finance.history_timeout")
+        return {}
+
+    def _format_indicators(self, histories: Dict) -> str:
+        """Indicator JSON for the prompt, or a note when no history is stored"""
+        if not histories:
+            return "No price history available."
+        return json.dumps(compute_indicators(histories), indent=2)
+        
     def _extract_symbols(self, query: str) -> List[str]:
         """Hybrid approach to extract stock symbols using regex and LLM"""
+        symbols, potential_symbols = self._candidate_symbols(query)
+        
+        # Use the LLM only for candidates the index could not settle
+        llm_response = None
+        if potential_symbols:
+            try:
+                llm_response = self._call_llm(self._symbol_prompt(query, potential_symbols), prompt_type="symbols")
+            except Exception:
+                pass
+        return self._resolve_symbols(symbols, potential_symbols, llm_response)
+        
+    async def _aextract_symbols(self, query: str) -> List[str]:
+        """Async variant of _extract_symbols"""
+        # The symbol index is built on first use, which would stall the event loop
+        symbols, potential_symbols = await asyncio.to_thread(self._candidate_symbols, query)
+        
+        llm_response = None
+        if potential_symbols:
+            try:
+                llm_response = await self._acall_llm(self._symbol_prompt(query, potential_symbols), prompt_type="symbols")
+            except Exception:
+                pass
+        return self._resolve_symbols(symbols, potential_symbols, llm_response)
+        
+    def _resolve_symbols(self, symbols: Set[str], potential_symbols: Set[str], llm_response: Optional[str]) -> List[str]:
+        """Add the candidates the LLM validated; all of them if it could not be asked"""
+        if potential_symbols:
+            symbols.update(potential_symbols if llm_response is None else self._parse_validated_symbols(llm_response))
+        return self._finalize_symbols(symbols)
+        
+    def _candidate_symbols(self, query: str) -> Tuple[Set[str], Set[str]]:
+        """Find confident symbols and potential symbols that need LLM validation"""
         symbols: Set[str] = set()
+        potential_symbols: Set[str] = set()
         
         # Step 1: Check for parentheses first (high confidence)
         parens_symbols = set(re.findall(r'\(([A-Z]{1,5})\)', query.upper()))
         if parens_symbols:
             symbols.update(s for s in parens_symbols if s not in self.common_words)
             
-        # Step 2: If no parentheses found, try standalone capitals
+        # Step 2: If no parentheses found, look up tickers and company names locally
         if not symbols:
+            symbols, potential_symbols = get_symbol_index().extract(query)
+            
+        # Step 3: If nothing was recognised (e.g. lowercase tickers), let the LLM judge standalone words
+        if not symbols and not potential_symbols:
             standalone_symbols = set(re.findall(r'\b[A-Z]{1,5}\b', query.upper()))
             potential_symbols = {s for s in standalone_symbols if s not in self.common_words}
             
-            # Step 3: Use LLM for validation
-            if potential_symbols:
-                llm_prompt = SYMBOL_EXTRACTION_PROMPT.format(
-                    query=query,
-                    potential_symbols=list(potential_symbols)
-                )
-                try:
-                    llm_response = self.llm.invoke(llm_prompt)
-                    if "VALID_SYMBOLS:" in llm_response:
-                        valid_symbols_str = llm_response.split("VALID_SYMBOLS:")[1].strip()
-                        validated_symbols = [
-                            re.search(r'\(([A-Z]+)\)', s.strip()).group(1)
-                            for s in valid_symbols_str.split(",")
-                            if re.search(r'\(([A-Z]+)\)', s.strip())
-                        ]
-                        symbols.update(validated_symbols)
-                except Exception as e:
-                    symbols.update(potential_symbols)
+        return symbols, potential_symbols
+        
+    def _symbol_prompt(self, query: str, potential_symbols: Set[str]) -> str:
+        """Build the symbol validation prompt"""
+        return SYMBOL_EXTRACTION_PROMPT.format(
+            query=query,
+            potential_symbols=list(potential_symbols)
+        )
+        
+    def _parse_validated_symbols(self, llm_response: str) -> List[str]:
+        """Parse the VALID_SYMBOLS line of a validation response"""
+        if "VALID_SYMBOLS:" not in llm_response:
+            return []
+        valid_symbols_str = llm_response.split("VALID_SYMBOLS:")[1].strip()
+        return [
+            re.search(r'\(([A-Z]+)\)', s.strip()).group(1)
+            for s in valid_symbols_str.split(",")
+            if re.search(r'\(([A-Z]+)\)', s.strip())
+        ]
         
+    def _finalize_symbols(self, symbols: Set[str]) -> List[str]:
+        """Keep well-formed symbols, failing if none are left"""
         valid_symbols = [s for s in symbols if self._is_valid_symbol_format(s)]
         
         if not valid_symbols:
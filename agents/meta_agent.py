@@ -1,56 +1,255 @@
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
 import json
+import time
 from agents.base_agent import BaseAgent
 from agents.registry import AgentRegistry
+from agents.router import QueryRouter
 from utils.prompts import META_AGENT_PROMPT, SYNTHESIS_PROMPT
+from utils import metrics
+from utils.metrics import RequestMetrics
 from utils.workpad import Workpad
 from utils.config import Config
 
+# Seconds between checks on agents still waiting for a pool thread
+QUEUE_POLL = 0.25
+
 class MetaAgent(BaseAgent):
     def __init__(self, callbacks=None):
         super().__init__("meta", callbacks)
         self.registry = AgentRegistry()
+        self.router = QueryRouter(self.registry)
         self.prompt = META_AGENT_PROMPT
         self.synthesis_prompt = SYNTHESIS_PROMPT
         self.workpad = Workpad()
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.execution_config.max_workers,
+            thread_name_prefix="agent"
+        )
         
-    def process(self, query: str) -> str:
-        """Process query through appropriate agents"""
-        try:
-            print("\nAnalyzing workflow...")
-            required_agents = self._analyze_query(query)
-            
-            print("\nGathering information...")
-            self.workpad.clear()
-            
-            # Process each agent
-            for agent_name in required_agents:
-                agent = self.registry.get_agent(agent_name)
-                if agent:
-                    print(f"\nProcessing {agent_name} agent...")
-                    response = agent.process(query)
-                    print(f"Got response from {agent_name}: {response[:100]}...")
-                    self.workpad.write(agent_name, response)
-            
-            # Synthesize once
-            print("\nSynthesizing response...")
-            content = self.workpad.get_all_content()
-            
-            # Add separator
-            print("\n" + "-" * 100)
+    def process(self, query: str, workpad: Optional[Workpad] = None, callbacks=None,
+                request_metrics: Optional[RequestMetrics] = None) -> str:
+        """Process query through appropriate agents
+
+        Concurrent callers pass their own workpad and callbacks; the callbacks
+        receive the synthesis tokens for this request only. Stage timings, LLM
+        statistics and cache counters are collected into request_metrics.
+        """
+        with metrics.track(request_metrics or RequestMetrics()):
+            try:
+                workpad = self._request_workpad(workpad)
+                    
+                print("\nAnalyzing workflow...")
+                with metrics.stage("routing"):
+                    required_agents = self._analyze_query(query)
+                
+                print("\nGathering information...")
+                
+                # Process each agent
+                with metrics.stage("agents"):
+                    if self._in_parallel(required_agents):
+                        self._run_agents_concurrently(query, required_agents, workpad)
+                    else:
+                        self._run_agents_sequentially(query, required_agents, workpad)
+                
+                # Synthesize once
+                synthesis_prompt = self._start_synthesis(query, workpad)
+                
+                # Generate final response - streamed through callbacks and returned
+                with metrics.stage("synthesis"):
+                    return self._invoke_llm(synthesis_prompt, callbacks=callbacks, prompt_type="synthesis")
+                
+            except Exception as e:
+                return self._workflow_error(e)
             
-            # Generate final response - stream only, don't return
-            synthesis_prompt = self.synthesis_prompt.format(
-                query=query,
-                agent_responses=json.dumps(content, indent=2)
-            )
+    async def aprocess(self, query: str, workpad: Optional[Workpad] = None, callbacks=None,
+                       request_metrics: Optional[RequestMetrics] = None) -> str:
+        """Async variant of process; agents run as tasks on the current event loop"""
+        with metrics.track(request_metrics or RequestMetrics()):
+            try:
+                workpad = self._request_workpad(workpad)
+                    
+                print("\nAnalyzing workflow...")
+                with metrics.stage("routing"):
+                    required_agents = await self._aanalyze_query(query)
+                
+                print("\nGathering information...")
+                with metrics.stage("agents"):
+                    if self._in_parallel(required_agents):
+                        await self._arun_agents_concurrently(query, required_agents, workpad)
+                    else:
+                        await self._arun_agents_sequentially(query, required_agents, workpad)
+                
+                synthesis_prompt = self._start_synthesis(query, workpad)
+                
+                with metrics.stage("synthesis"):
+                    return await self._ainvoke_llm(synthesis_prompt, callbacks=callbacks, prompt_type="synthesis")
+                
+            except Exception as e:
+                return self._workflow_error(e)
             
-            self._invoke_llm(synthesis_prompt)
-            return ""  # Return empty string since we're streaming
+    def _request_workpad(self, workpad: Optional[Workpad]) -> Workpad:
+        """The caller's workpad, or the shared one cleared for a new query"""
+        if workpad is None:
+            workpad = self.workpad
+            workpad.clear()
+        return workpad
+        
+    def _in_parallel(self, agent_names: List[str]) -> bool:
+        return Config.execution_config.parallel_agents and len(agent_names) > 1
+        
+    def _start_synthesis(self, query: str, workpad: Workpad) -> str:
+        """Announce synthesis and build its prompt"""
+        print("\nSynthesizing response...")
+        synthesis_prompt = self._build_synthesis_prompt(query, workpad)
+        
+        # Add separator
+        print("\n" + "-" * 100)
+        return synthesis_prompt
+        
+    def _workflow_error(self, error: Exception) -> str:
+        metrics.incr("workflow.error")
+        print(f"Error in workflow: {str(error)}")
+        return str(error)
             
+    def _build_synthesis_prompt(self, query: str, workpad: Workpad) -> str:
+        """Format the synthesis prompt from everything on the workpad"""
+        return self.synthesis_prompt.format(
+            query=query,
+            agent_responses=json.dumps(workpad.get_all_content(), indent=2)
+        )
+
+    def _agents(self, agent_names: List[str]):
+        """Yield (name, agent) for each registered agent, announcing it"""
+        for agent_name in agent_names:
+            agent = self.registry.get_agent(agent_name)
+            if agent:
+                print(f"\nProcessing {agent_name} agent...")
+                yield agent_name, agent
+
+    def _record(self, workpad: Workpad, agent_name: str, response: str, start: float) -> None:
+        """Write an agent's response to the workpad"""
+        print(f"Got response from {agent_name}: {response[:100]}...")
+        workpad.write(agent_name, response, {"elapsed": time.monotonic() - start})
+
+    def _run_agents_sequentially(self, query: str, agent_names: List[str], workpad: Workpad) -> None:
+        """Run agents one after another, writing each result to the workpad"""
+        for agent_name, agent in self._agents(agent_names):
+            start = time.monotonic()
+            self._record(workpad, agent_name, self._run_agent(agent, query), start)
+
+    async def _arun_agents_sequentially(self, query: str, agent_names: List[str], workpad: Workpad) -> None:
+        """Async variant of _run_agents_sequentially"""
+        for agent_name, agent in self._agents(agent_names):
+            start = time.monotonic()
+            self._record(workpad, agent_name, await self._arun_agent(agent, query), start)
+
+    def _run_agents_concurrently(self, query: str, agent_names: List[str], workpad: Workpad) -> None:
+        """Fan out to all agents at once and keep whatever finishes before its deadline
+
+        Each agent's deadline runs from when a pool thread picks it up, so
+        agents queued behind other requests (e.g. in a batch) are not
+        timed out before they start.
+        """
+        start = time.monotonic()
+        started = {}
+
+        def run(agent_name: str, agent: BaseAgent) -> str:
+            started[agent_name] = time.monotonic()
+            return self._run_agent(agent, query)
+
+        futures = {
+            self._executor.submit(metrics.bind(run), agent_name, agent): agent_name
+            for agent_name, agent in self._agents(agent_names)
+        }
+
+        pending = set(futures)
+        while pending:
+            # Agents still queued get a rolling deadline, so the wait wakes up to start their clock
+            now = time.monotonic()
+            deadlines = {
+                future: started[futures[future]] + self._agent_timeout(futures[future])
+                if futures[future] in started else now + QUEUE_POLL
+                for future in pending
+            }
+            # Running threads cannot be interrupted; their result is simply discarded
+            pending = self._drop_expired(pending, futures, deadlines)
+            if not pending:
+                break
+            done, pending = wait(pending, timeout=self._until_next(pending, deadlines), return_when=FIRST_COMPLETED)
+            for future in done:
+                self._collect(future, futures[future], workpad, start)
+
+    async def _arun_agents_concurrently(self, query: str, agent_names: List[str], workpad: Workpad) -> None:
+        """Async variant of _run_agents_concurrently; late agents are cancelled outright"""
+        start = time.monotonic()
+        tasks = {
+            asyncio.create_task(self._arun_agent(agent, query)): agent_name
+            for agent_name, agent in self._agents(agent_names)
+        }
+        deadlines = {task: start + self._agent_timeout(tasks[task]) for task in tasks}
+
+        pending = set(tasks)
+        try:
+            while pending:
+                pending = self._drop_expired(pending, tasks, deadlines)
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=self._until_next(pending, deadlines), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    self._collect(task, tasks[task], workpad, start)
+        finally:
+            # If this request is cancelled (e.g. the client disconnected), its agents must stop too
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _drop_expired(self, pending: set, names: dict, deadlines: dict) -> set:
+        """Cancel agents (futures or tasks) past their deadline, returning those still running"""
+        now = time.monotonic()
+        for handle in [h for h in pending if deadlines[h] <= now]:
+            handle.cancel()
+            print(f"{names[handle]} agent timed out, continuing without it")
+        return {h for h in pending if deadlines[h] > now}
+
+    def _until_next(self, pending: set, deadlines: dict) -> float:
+        """Seconds until the earliest pending deadline"""
+        return max(min(deadlines[h] for h in pending) - time.monotonic(), 0.0)
+
+    def _collect(self, handle, agent_name: str, workpad: Workpad, start: float) -> None:
+        """Record a finished agent's response, or report its failure"""
+        try:
+            response = handle.result()
         except Exception as e:
-            print(f"Error in workflow: {str(e)}")
-            return str(e)
+            print(f"{agent_name} agent failed: {str(e)}")
+            return
+        self._record(workpad, agent_name, response, start)
+
+    def _run_agent(self, agent: BaseAgent, query: str) -> str:
+        """Run one agent, timing it as its own stage"""
+        with metrics.stage(f"agent.{agent.name}"):
+            return agent.process(query)
+            
+    async def _arun_agent(self, agent: BaseAgent, query: str) -> str:
+        """Async variant of _run_agent"""
+        with metrics.stage(f"agent.{agent.name}"):
+            return await agent.aprocess(query)
+
+    def _prefetch(self, query: str) -> None:
+        """Let every registered agent start speculative fetches"""
+        for agent_name in self.registry.list_agents():
+            try:
+                self.registry.get_agent(agent_name).prefetch(query)
+            except Exception as e:
+                print(f"Prefetch for {agent_name} failed: {str(e)}")
+
+    def _agent_timeout(self, agent_name: str) -> float:
+        """Get the deadline in seconds for an agent"""
+        config = Config.execution_config
+        return config.agent_timeouts.get(agent_name, config.agent_timeout)
 
     def _synthesize_from_workpad(self, query: str) -> str:
         """Synthesize final response from workpad content"""
@@ -74,7 +273,7 @@ Information from {agent}:
             )
             
             # Get synthesis
-            return self._invoke_llm(synthesis_prompt)
+            return self._invoke_llm(synthesis_prompt, prompt_type="synthesis")
             
         except Exception as e:
             return f"Synthesis failed: {str(e)}"
@@ -82,61 +281,118 @@ Information from {agent}:
     def _analyze_workflow(self, query: str) -> List[dict]:
         """Build dynamic workflow based on query analysis"""
         try:
-            analysis_prompt = self.prompt.format(
-                query=query,
-                available_agents=self.registry.list_agents()
-            )
-            
-            response = self._invoke_llm(analysis_prompt)
-            workflow = []
-            
-            if "WORKFLOW:" in response:
-                workflow_text = response.split("WORKFLOW:")[1]
-                if "REASON:" in workflow_text:
-                    workflow_text = workflow_text.split("REASON:")[0]
+            response = self._invoke_llm(self._build_workflow_prompt(query), prompt_type="routing")
+            return self._parse_workflow(response)
                 
-                lines = [line.strip() for line in workflow_text.split('\n') if line.strip()]
-                for line in lines:
-                    if "->" in line:
-                        parts = line.split("->")
-                        agent = parts[0].strip().lstrip('-')
-                        reason = parts[1].split("-")[0].strip()
-                        if agent in self.registry.list_agents():
-                            workflow.append({
-                                "agent": agent,
-                                "reason": reason
-                            })
-            
-            return workflow or [{"agent": "web", "reason": "fallback"}]
+        except Exception as e:
+            return self._workflow_fallback(e)
+            
+    async def _aanalyze_workflow(self, query: str) -> List[dict]:
+        """Async variant of _analyze_workflow"""
+        try:
+            response = await self._ainvoke_llm(self._build_workflow_prompt(query), prompt_type="routing")
+            return self._parse_workflow(response)
                 
         except Exception as e:
-            print(f"Workflow analysis failed: {str(e)}")
-            return [{"agent": "web", "reason": "error fallback"}]
+            return self._workflow_fallback(e)
+            
+    def _workflow_fallback(self, error: Exception) -> List[dict]:
+        print(f"Workflow analysis failed: {str(error)}")
+        return [{"agent": "web", "reason": "error fallback"}]
+            
+    def _build_workflow_prompt(self, query: str) -> str:
+        """Format the planner prompt"""
+        return self.prompt.format(
+            query=query,
+            available_agents=self.registry.list_agents()
+        )
+        
+    def _parse_workflow(self, response: str) -> List[dict]:
+        """Parse the WORKFLOW block of a planner response"""
+        workflow = []
+        
+        if "WORKFLOW:" in response:
+            workflow_text = response.split("WORKFLOW:")[1]
+            if "REASON:" in workflow_text:
+                workflow_text = workflow_text.split("REASON:")[0]
+            
+            lines = [line.strip() for line in workflow_text.split('\n') if line.strip()]
+            for line in lines:
+                if "->" in line:
+                    parts = line.split("->")
+                    agent = parts[0].strip().lstrip('-')
+                    reason = parts[1].split("-")[0].strip()
+                    if agent in self.registry.list_agents():
+                        workflow.append({
+                            "agent": agent,
+                            "reason": reason
+                        })
+        
+        return workflow or [{"agent": "web", "reason": "fallback"}]
 
     def _analyze_query(self, query: str) -> List[str]:
         """Extract required agents from workflow analysis"""
         try:
-            workflow = self._analyze_workflow(query)
-            required_agents = []
+            routed_agents = self._route_locally(query)
+            if routed_agents:
+                return routed_agents
+            return self._select_agents(query, self._analyze_workflow(query))
             
-            # Extract agents from workflow and validate them
-            for step in workflow:
-                agent = step.get("agent")
-                if agent and agent in self.registry.list_agents():
-                    if agent not in required_agents:
-                        required_agents.append(agent)
-            
-            # If no valid agents found, use web as fallback
-            if not required_agents:
-                print("No valid agents found in workflow, falling back to web")
-                return ["web"]
+        except Exception as e:
+            return self._routing_fallback(e)
             
-            print(f"Selected agents from workflow: {required_agents}")
-            return required_agents
+    async def _aanalyze_query(self, query: str) -> List[str]:
+        """Async variant of _analyze_query"""
+        try:
+            # Routing may load the routing log and build the symbol index for prefetches,
+            # and recording a decision appends to the log, so both run off the event loop
+            routed_agents = await asyncio.to_thread(self._route_locally, query)
+            if routed_agents:
+                return routed_agents
+            workflow = await self._aanalyze_workflow(query)
+            return await asyncio.to_thread(self._select_agents, query, workflow)
             
         except Exception as e:
-            print(f"Workflow analysis failed: {str(e)}, falling back to web")
+            return self._routing_fallback(e)
+            
+    def _routing_fallback(self, error: Exception) -> List[str]:
+        print(f"Workflow analysis failed: {str(error)}, falling back to web")
+        return ["web"]
+            
+    def _route_locally(self, query: str) -> Optional[List[str]]:
+        """Try the local router, starting prefetches if the planner is needed"""
+        routed_agents = self.router.route(query)
+        if routed_agents:
+            print(f"Selected agents from router: {routed_agents}")
+            metrics.incr("routing.local")
+            return routed_agents
+        metrics.incr("routing.planner")
+        
+        # Overlap predictable tool I/O with the planner's generation
+        if Config.execution_config.prefetch_enabled:
+            self._prefetch(query)
+        return None
+        
+    def _select_agents(self, query: str, workflow: List[dict]) -> List[str]:
+        """Turn a planner workflow into the list of agents to run"""
+        required_agents = []
+        
+        # Extract agents from workflow and validate them
+        for step in workflow:
+            agent = step.get("agent")
+            if agent and agent in self.registry.list_agents():
+                if agent not in required_agents:
+                    required_agents.append(agent)
+        
+        # If no valid agents found, use web as fallback
+        if not required_agents:
+            print("No valid agents found in workflow, falling back to web")
             return ["web"]
+        
+        print(f"Selected agents from workflow: {required_agents}")
+        if not any("fallback" in step.get("reason", "") for step in workflow):
+            self.router.record(query, required_agents)
+        return required_agents
 
 
 #please give me a comprehensive strategy to trade options and search the web for hot stocks to trade them on
\ No newline at end of file
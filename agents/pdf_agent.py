@@ -1,26 +1,35 @@
 from agents.base_agent import BaseAgent
+from tools.pdf_tools import PDFTool
+from utils import metrics
 from utils.prompts import PDF_AGENT_PROMPT
 from typing import List, Optional
+import asyncio
 
 class PDFAgent(BaseAgent):
     def __init__(self, callbacks=None):
         super().__init__("pdf", callbacks)
+        # Starts loading the index in the background so startup is not blocked
+        self.pdf_tool = PDFTool()
         self.prompt = PDF_AGENT_PROMPT
         
     def process(self, query: str) -> str:
         """Process PDF-related queries"""
         try:
-            # Your existing PDF processing logic
-            context = self._get_relevant_context(query)
-            prompt = self.prompt.format(
-                context=context,
-                query=query
-            )
-            return self._invoke_llm(prompt)
+            with metrics.stage("pdf.retrieval"):
+                context = self._get_relevant_context(query)
+            return self._invoke_llm(self.prompt.format(context=context, query=query))
+        except Exception as e:
+            return f"PDF processing error: {str(e)}"
+            
+    async def aprocess(self, query: str) -> str:
+        """Async variant of process; retrieval runs off the event loop"""
+        try:
+            with metrics.stage("pdf.retrieval"):
+                context = await asyncio.to_thread(self._get_relevant_context, query)
+            return await self._ainvoke_llm(self.prompt.format(context=context, query=query))
         except Exception as e:
             return f"PDF processing error: {str(e)}"
             
     def _get_relevant_context(self, query: str) -> str:
-        """Get relevant context from PDF documents"""
-        # Your existing context retrieval logic
-        return "PDF context placeholder"  # Replace with actual implementation
\ No newline at end of file
+        """Get relevant context from PDF documents, waiting for the index if it is still loading"""
+        return self.pdf_tool.query_documents(query)
\ No newline at end of file
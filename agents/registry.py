@@ -22,6 +22,10 @@ class AgentRegistry:
         """List all registered agents"""
         return list(self._agents.keys())
         
+    def list_purposes(self) -> Dict[str, str]:
+        """List the purpose description of every known agent"""
+        return dict(self._purposes)
+        
     def get_agent_purpose(self, name: str) -> str:
         """Get the purpose description for an agent"""
         return self._purposes.get(name, "Purpose not specified")
\ No newline at end of file
@@ -0,0 +1,248 @@
+from typing import Dict, List, Optional
+from collections import Counter, OrderedDict, deque
+import json
+import math
+import os
+import re
+import threading
+from utils.config import Config
+
+# Patterns that are strong evidence an agent is needed
+ROUTING_RULES: Dict[str, List[str]] = {
+    "finance": [
+        r"\([A-Z]{1,5}\)",
+        r"\$[A-Z]{1,5}\b",
+        r"\b(stock|share) price\b",
+        r"\bprice\b",
+        r"\bquote\b",
+        r"\bmarket cap",
+        r"\bp/?e ratio\b",
+        r"\beps\b",
+        r"\bvolume\b",
+        r"\bvaluation\b",
+        r"\bfundamentals?\b",
+        r"\btrading at\b",
+        r"\b(compare|vs\.?|versus)\b"
+    ],
+    "web": [
+        r"\bnews\b",
+        r"\blatest\b",
+        r"\brecent(ly)?\b",
+        r"\btoday\b",
+        r"\bthis (week|month|year)\b",
+        r"\bcurrent(ly)? (events|context|trends?|market)\b",
+        r"\bhappening\b",
+        r"\banalysts?\b",
+        r"\bannounce(d|ment)?\b",
+        r"\bhot stocks?\b",
+        r"\bsearch the web\b"
+    ],
+    "pdf": [
+        r"\bexplain\b",
+        r"\bstrateg(y|ies)\b",
+        r"\bbasics?\b",
+        r"\bguide\b",
+        r"\blearn(ing)?\b",
+        r"\bdefin(e|ition)\b",
+        r"\bprinciples?\b",
+        r"\bbeginners?\b",
+        r"\bconcepts?\b",
+        r"\b(trad(e|ing)|call|put|stock) options\b",
+        r"\boptions? (trading|strateg(y|ies)|contracts?)\b",
+        r"\brisk management\b"
+    ]
+}
+
+# Generic question phrasing leans towards background knowledge, but most
+# finance and news questions are phrased the same way, so these only count
+# when no agent has a specific rule match
+QUESTION_RULES: Dict[str, List[str]] = {
+    "pdf": [
+        r"\bwhat (is|are)\b",
+        r"\bhow (do|does|to|can)\b"
+    ]
+}
+
+# Seed examples mirroring the planner prompt, used alongside the agent purposes
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "finance": [
+        "what's aapl's price",
+        "compare msft and aapl current metrics",
+        "show tsla key financial ratios",
+        "nvda market cap pe ratio and eps"
+    ],
+    "web": [
+        "latest news about ai developments",
+        "what are analysts saying about the semiconductor industry",
+        "current market trends in tech sector"
+    ],
+    "pdf": [
+        "how do i trade options",
+        "explain the basics of technical analysis",
+        "what are the fundamental principles of investing"
+    ]
+}
+
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "is", "are",
+    "me", "my", "i", "you", "it", "its", "s", "with", "about", "give", "please",
+    # Question words say how something is asked, not which agent can answer it
+    "what", "what's", "how", "do", "does", "can", "should", "tell"
+}
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups"""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+def _embed(text: str) -> Dict[str, float]:
+    """Embed text as a sparse bag of words and bigrams"""
+    words = [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOP_WORDS]
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return dict(features)
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Cosine similarity between two sparse vectors"""
+    if not a or not b:
+        return 0.0
+    dot = sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+class QueryRouter:
+    """Local keyword and embedding router that decides agents without an LLM call"""
+    def __init__(self, registry):
+        self.registry = registry
+        self.config = Config.routing_config
+        # Ticker patterns rely on capitals, everything else is case-insensitive
+        self._rules = {
+            agent: [re.compile(p, 0 if "[A-Z]" in p else re.IGNORECASE) for p in patterns]
+            for agent, patterns in ROUTING_RULES.items()
+        }
+        self._question_rules = {
+            agent: [re.compile(p, re.IGNORECASE) for p in patterns]
+            for agent, patterns in QUESTION_RULES.items()
+        }
+        self._centroids: Optional[Dict[str, Dict[str, float]]] = None
+        self._history = deque(maxlen=self.config.history_size)
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def route(self, query: str) -> Optional[List[str]]:
+        """Return the agents for a query, or None when the LLM planner should decide"""
+        if not self.config.enabled:
+            return None
+
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(self._cache[key])
+            self.misses += 1
+            self._train()
+            agents, confidence = self._classify(query)
+
+        if not agents or confidence < self.config.min_confidence:
+            return None
+
+        self._remember(key, agents)
+        return agents
+
+    def record(self, query: str, agents: List[str]) -> None:
+        """Cache and log a routing decision made by the LLM planner"""
+        if not self.config.enabled or not agents:
+            return
+        self._remember(normalize_query(query), agents)
+        with self._lock:
+            if self._centroids is not None:
+                self._learn(query, agents)
+
+        try:
+            os.makedirs(os.path.dirname(self.config.log_path), exist_ok=True)
+            with open(self.config.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"query": query, "agents": agents}) + "\n")
+        except OSError as e:
+            print(f"Could not log routing decision: {str(e)}")
+
+    def _classify(self, query: str) -> tuple:
+        """Score every registered agent and return the selection with its confidence"""
+        vector = _embed(query)
+        available = self.registry.list_agents()
+
+        # A near-identical past query is the strongest signal we have
+        for past_vector, past_agents in self._history:
+            if _cosine(vector, past_vector) >= self.config.history_match:
+                agents = [a for a in past_agents if a in available]
+                if agents:
+                    return agents, 1.0
+
+        similarities = {
+            agent: _cosine(vector, centroid)
+            for agent, centroid in self._centroids.items()
+            if agent in available
+        }
+        top_similarity = max(similarities.values(), default=0.0)
+
+        hits = {
+            agent: sum(1 for rule in self._rules.get(agent, []) if rule.search(query))
+            for agent in available
+        }
+        if not any(hits.values()):
+            for agent in available:
+                hits[agent] = sum(1 for rule in self._question_rules.get(agent, []) if rule.search(query))
+
+        scores = {}
+        for agent in available:
+            rule_score = 1 - 0.5 ** hits[agent]
+            similarity = similarities.get(agent, 0.0) / top_similarity if top_similarity else 0.0
+            scores[agent] = 0.6 * rule_score + 0.4 * similarity
+
+        threshold = self.config.select_threshold
+        selected = [agent for agent, score in scores.items() if score >= threshold]
+        if not scores:
+            return [], 0.0
+        # Confidence is how far the least clear-cut agent sits from the decision boundary
+        confidence = min(abs(score - threshold) / threshold for score in scores.values())
+        return selected, min(confidence, 1.0)
+
+    def _train(self) -> None:
+        """Build agent centroids from purposes, seed examples and logged routings"""
+        if self._centroids is not None:
+            return
+        self._centroids = {}
+        for agent, purpose in self.registry.list_purposes().items():
+            self._add_example(agent, purpose)
+            for example in SEED_EXAMPLES.get(agent, []):
+                self._add_example(agent, example)
+
+        if os.path.exists(self.config.log_path):
+            try:
+                with open(self.config.log_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        self._learn(entry["query"], entry["agents"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load routing log: {str(e)}")
+
+    def _learn(self, query: str, agents: List[str]) -> None:
+        """Fold a labelled routing into the centroids and history"""
+        for agent in agents:
+            self._add_example(agent, query)
+        self._history.append((_embed(query), list(agents)))
+
+    def _add_example(self, agent: str, text: str) -> None:
+        """Add an example's features to an agent centroid"""
+        centroid = self._centroids.setdefault(agent, {})
+        for feature, weight in _embed(text).items():
+            centroid[feature] = centroid.get(feature, 0.0) + weight
+
+    def _remember(self, key: str, agents: List[str]) -> None:
+        """Store a decision in the bounded routing cache"""
+        with self._lock:
+            self._cache[key] = list(agents)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.config.cache_size:
+                self._cache.popitem(last=False)
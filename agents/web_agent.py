@@ -1,27 +1,64 @@
 from agents.base_agent import BaseAgent
+from tools.article_tools import ArticleReader
 from tools.web_tools import SerperTool
+from utils.config import Config
 from utils.prompts import WEB_AGENT_PROMPT
+from utils.speculation import speculator
+from typing import Dict, List
 
 class WebAgent(BaseAgent):
     def __init__(self, callbacks=None):
         super().__init__("web", callbacks)
         self.search_tool = SerperTool()
+        self.article_reader = ArticleReader() if Config.article_config.enabled else None
         self.prompt = WEB_AGENT_PROMPT
         
     def process(self, query: str) -> str:
         """Process web-based queries with search and analysis"""
         try:
             # Get search results
-            search_results = self.search_tool.search(query)
+            search_results = speculator.claim(("web", query))
+            if search_results is None:
+                search_results = self.search_tool.search(query)
             
-            # Format prompt with results
-            prompt = self.prompt.format(
-                search_results=search_results,
-                query=query
-            )
+            articles = self.article_reader.read(search_results, query) if self.article_reader else []
             
             # Use streaming invoke
-            return self._invoke_llm(prompt)
+            return self._invoke_llm(self._build_prompt(query, search_results, articles))
             
         except Exception as e:
-            return f"Error in web agent: {str(e)}" 
\ No newline at end of file
+            return f"Error in web agent: {str(e)}"
+            
+    async def aprocess(self, query: str) -> str:
+        """Async variant of process"""
+        try:
+            search_results = await speculator.aclaim(("web", query))
+            if search_results is None:
+                search_results = await self.search_tool.asearch(query)
+            
+            articles = await self.article_reader.aread(search_results, query) if self.article_reader else []
+            return await self._ainvoke_llm(self._build_prompt(query, search_results, articles))
+            
+        except Exception as e:
+            return f"Error in web agent: {str(e)}"
+            
+    def prefetch(self, query: str) -> None:
+        """Start the search while the planner is still deciding"""
+        speculator.submit(("web", query), self.search_tool.search, query)
+        
+    def _build_prompt(self, query: str, search_results: List[Dict], articles: List[Dict]) -> str:
+        """Format the prompt with the search results and article passages"""
+        return self.prompt.format(
+            search_results=search_results,
+            articles=self._format_articles(articles),
+            query=query
+        )
+        
+    def _format_articles(self, articles: List[Dict]) -> str:
+        """Article passages for the prompt"""
+        if not articles:
+            return "No article text available; rely on the snippets."
+        return "\n\n".join(
+            f"[{article['title'] or article['link']}] ({article['link']})\n{article['passages']}"
+            for article in articles
+        )
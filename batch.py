@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from typing import Dict, List
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from main import ExpertSystem, configure_provider
+from utils.llm_cache import llm_cache
+from utils.metrics import RequestMetrics
+from utils.workpad import Workpad
+
+# Request counters meaning the answer is an error message rather than a response
+FAILURE_COUNTERS = ("workflow.error", "llm.error.synthesis")
+
+def load_queries(input_path: str) -> List[dict]:
+    """Read queries from a JSONL file, defaulting ids to line numbers"""
+    queries = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            queries.append({
+                "id": str(entry.get("id", line_number)),
+                "query": entry["query"]
+            })
+    return queries
+
+def load_completed_ids(output_path: str) -> set:
+    """Collect ids already answered in a previous run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                # Failed queries are retried on the next run
+                if "error" not in result:
+                    completed.add(str(result["id"]))
+            except (ValueError, KeyError):
+                continue  # Partially written line from an interrupted run
+    return completed
+
+def run_query(system: ExpertSystem, entry: dict) -> dict:
+    """Answer one query and collect its per-stage timings"""
+    workpad = Workpad()
+    request_metrics = RequestMetrics(request_id=entry["id"])
+    answer = system.meta_agent.process(entry["query"], workpad=workpad, request_metrics=request_metrics)
+    snapshot = request_metrics.to_dict()
+    # The meta agent answers with the error text when the workflow or synthesis fails
+    if any(name in snapshot["counters"] for name in FAILURE_COUNTERS):
+        raise RuntimeError(answer)
+    return {
+        "id": entry["id"],
+        "query": entry["query"],
+        "answer": answer,
+        "timings": {**snapshot["stages"], "total": snapshot["duration"]},
+        "counters": snapshot["counters"],
+        "llm_calls": snapshot["llm_calls"]
+    }
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def hit_rate(hits: int, misses: int) -> str:
+    """Format a cache hit rate"""
+    total = hits + misses
+    return f"{hits / total:.1%} ({hits}/{total})" if total else "n/a"
+
+def cache_report(system: ExpertSystem) -> Dict[str, str]:
+    """Summarise hit rates of the caches shared across the batch"""
+    registry = system.meta_agent.registry
+    report = {
+        "router": hit_rate(system.meta_agent.router.hits, system.meta_agent.router.misses),
+        "llm": hit_rate(llm_cache.hits, llm_cache.misses)
+    }
+    finance_agent = registry.get_agent("finance")
+    if finance_agent:
+        tool = finance_agent.finance_tool
+        report["finance"] = hit_rate(tool.cache_hits, tool.cache_misses)
+        report["finance memory tier"] = hit_rate(tool.cache.memory_hits, tool.cache.disk_hits + tool.cache.misses)
+    web_agent = registry.get_agent("web")
+    if web_agent:
+        tool = web_agent.search_tool
+        report["web"] = hit_rate(tool.cache_hits, tool.cache_misses)
+        report["web memory tier"] = hit_rate(tool.cache.memory_hits, tool.cache.disk_hits + tool.cache.misses)
+    return report
+
+def transport_report(system: ExpertSystem) -> Dict[str, dict]:
+    """Connection pool statistics of the tools' HTTP transports"""
+    registry = system.meta_agent.registry
+    report = {}
+    for agent_name, tool_attr in (("finance", "finance_tool"), ("web", "search_tool")):
+        agent = registry.get_agent(agent_name)
+        if agent:
+            transport = getattr(agent, tool_attr).http
+            report[transport.name] = transport.stats()
+    return report
+
+def run_batch(system: ExpertSystem, input_path: str, output_path: str, workers: int, verbose: bool = False):
+    """Run all pending queries and append results to the output file"""
+    queries = load_queries(input_path)
+    completed = load_completed_ids(output_path)
+    pending = [entry for entry in queries if entry["id"] not in completed]
+    print(f"{len(queries)} queries, {len(completed)} already done, {len(pending)} to run", file=sys.stderr)
+
+    latencies = []
+    failures = 0
+    start = time.monotonic()
+    with open(output_path, "a", encoding="utf-8") as out, \
+            open(os.devnull, "w") as devnull, \
+            redirect_stdout(sys.stdout if verbose else devnull), \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(run_query, system, entry): entry for entry in pending}
+        for done_count, future in enumerate(as_completed(futures), 1):
+            entry = futures[future]
+            try:
+                result = future.result()
+                latencies.append(result["timings"]["total"])
+            except Exception as e:
+                failures += 1
+                result = {"id": entry["id"], "query": entry["query"], "error": str(e)}
+            # One complete line per query so interrupted runs can resume
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            print(f"[{done_count}/{len(pending)}] {entry['id']}", file=sys.stderr)
+    elapsed = time.monotonic() - start
+
+    print("\nBatch Report")
+    print(f"Queries: {len(latencies)} answered, {failures} failed in {elapsed:.1f}s")
+    print(f"Throughput: {len(latencies) / elapsed if elapsed else 0.0:.2f} queries/sec")
+    print(f"Latency p50: {percentile(latencies, 50):.2f}s  p95: {percentile(latencies, 95):.2f}s")
+    for name, rate in cache_report(system).items():
+        print(f"Cache hit rate ({name}): {rate}")
+    web_agent = system.meta_agent.registry.get_agent("web")
+    if web_agent:
+        stats = web_agent.search_tool.cache_stats()
+        print(f"Search cache memory: {stats['memory_entries']} entries, {stats['memory_bytes'] / 1024:.0f} KB")
+    for name, stats in transport_report(system).items():
+        print(f"HTTP ({name}): {stats['requests']} requests over {stats['connections_opened']} connections, "
+              f"{stats['retries']} retries, {stats['errors']} errors")
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries in parallel")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"query\"} object per line")
+    parser.add_argument("output", help="JSONL file for answers; existing ids are skipped")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "groq", "fake"])
+    parser.add_argument("--cache-minutes", type=float, default=None,
+                        help="Keep tool results for this long so each symbol/search is fetched once per batch")
+    parser.add_argument("--verbose", action="store_true", help="Show agent progress output")
+    args = parser.parse_args()
+
+    configure_provider(args.provider)
+    system = ExpertSystem(streaming=False)
+
+    if args.cache_minutes is not None:
+        registry = system.meta_agent.registry
+        finance_agent = registry.get_agent("finance")
+        if finance_agent:
+            tool = finance_agent.finance_tool
+            # Only ever lengthen the TTLs; fundamentals already outlive any batch
+            tool.cache_ttls = {function: max(ttl, args.cache_minutes * 60) for function, ttl in tool.cache_ttls.items()}
+        web_agent = registry.get_agent("web")
+        if web_agent:
+            web_agent.search_tool.cache_ttl = max(web_agent.search_tool.cache_ttl, args.cache_minutes * 60)
+
+    run_batch(system, args.input, args.output, args.workers, args.verbose)
+
+if __name__ == "__main__":
+    main()
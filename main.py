@@ -3,29 +3,37 @@ from agents.pdf_agent import PDFAgent
 from agents.finance_agent import FinanceAgent
 from agents.web_agent import WebAgent
 import json
+import os
 from utils.config import Config
 from utils.callbacks import StreamingHandler
+from utils.metrics import RequestMetrics
 
 class ExpertSystem:
-    def __init__(self):
+    def __init__(self, streaming: bool = True):
         print("Loading Expert System...")
-        # Initialize streaming handler
+        # Initialize streaming handler; servers stream per request instead
         self.streaming_handler = StreamingHandler()
+        self.last_metrics = None
+        callbacks = [self.streaming_handler] if streaming else []
         
         # Initialize meta agent with streaming
-        self.meta_agent = MetaAgent(callbacks=[self.streaming_handler])
+        self.meta_agent = MetaAgent(callbacks=callbacks)
+        
+        # Concurrent agents would interleave their tokens on stdout, so only
+        # the planner and synthesis stream when agents run in parallel
+        agent_callbacks = [] if Config.execution_config.parallel_agents else callbacks
         
         # Initialize and register available agents
-        self._initialize_agents()
+        self._initialize_agents(agent_callbacks)
         
-    def _initialize_agents(self):
+    def _initialize_agents(self, callbacks):
         """Initialize and register all available agents"""
         print("Initializing PDF agent...")
-        pdf_agent = PDFAgent(callbacks=[self.streaming_handler])
+        pdf_agent = PDFAgent(callbacks=callbacks)
         print("Initializing Finance agent...")
-        finance_agent = FinanceAgent(callbacks=[self.streaming_handler])
+        finance_agent = FinanceAgent(callbacks=callbacks)
         print("Initializing Web agent...")
-        web_agent = WebAgent(callbacks=[self.streaming_handler])
+        web_agent = WebAgent(callbacks=callbacks)
         
         # Register all agents
         self.meta_agent.registry.register("pdf", pdf_agent)
@@ -37,7 +45,8 @@ class ExpertSystem:
         try:
             print("\nProcessing query...\n")
             # Get the response but don't print it - streaming handler will handle that
-            response = self.meta_agent.process(query)
+            self.last_metrics = RequestMetrics()
+            response = self.meta_agent.process(query, request_metrics=self.last_metrics)
             print("\n")  # Add spacing after response
             return ""
         except Exception as e:
@@ -61,27 +70,55 @@ class ExpertSystem:
             }
         }, indent=2)
 
+def use_fake_tools(cache_dir: str = "./data/cache/fake") -> None:
+    """Answer tool requests locally, keeping canned data out of the real caches"""
+    Config.api_config.fake_tools = True
+    Config.market_cache_config.path = os.path.join(cache_dir, "market_data.sqlite")
+    Config.market_cache_config.history_dir = os.path.join(cache_dir, "prices")
+    Config.search_cache_config.path = os.path.join(cache_dir, "search_cache.sqlite")
+    Config.article_config.cache_path = os.path.join(cache_dir, "article_cache.sqlite")
+
+def configure_provider(provider: str) -> None:
+    """Point the model config at a provider"""
+    if provider == "ollama":
+        Config.model_config.provider = "ollama"
+        Config.model_config.model_name = "llama3.2"
+    elif provider == "groq":
+        if not Config.model_config.groq_api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables")
+        Config.model_config.provider = "groq"
+        Config.model_config.model_name = Config.model_config.groq_model_name
+    elif provider == "fake":
+        Config.model_config.provider = "fake"
+        Config.model_config.model_name = "fake"
+        use_fake_tools()
+    else:
+        raise ValueError(f"Unknown provider: {provider}")
+
 def select_model():
     """Allow user to select model provider"""
     print("\nSelect Model Provider:")
     print("1. Local (Ollama LLaMA 3.2)")
     print("2. Groq (LLaMA 3.2 90B)")
+    print("3. Fake (offline benchmarking)")
     
     while True:
-        choice = input("\nEnter choice (1 or 2): ").strip()
+        choice = input("\nEnter choice (1, 2 or 3): ").strip()
         if choice == "1":
-            Config.model_config.provider = "ollama"
-            Config.model_config.model_name = "llama3.2"
+            configure_provider("ollama")
             break
         elif choice == "2":
-            Config.model_config.provider = "groq"
-            Config.model_config.model_name = Config.model_config.groq_model_name
-            if not Config.model_config.groq_api_key:
-                print("Error: GROQ_API_KEY not found in environment variables")
+            try:
+                configure_provider("groq")
+            except ValueError as e:
+                print(f"Error: {str(e)}")
                 continue
             break
+        elif choice == "3":
+            configure_provider("fake")
+            break
         else:
-            print("Invalid choice. Please enter 1 or 2.")
+            print("Invalid choice. Please enter 1, 2 or 3.")
 
 def main():
     print("Initializing Expert System...")
@@ -0,0 +1,112 @@
+import os
+import argparse
+import time
+import faiss
+import numpy as np
+from faiss_index import build_index, factory_string, index_memory
+
+DEFAULT_TYPES = "flat,ivf,ivf_sq8,ivf_pq,hnsw,hnsw_sq8"
+
+def load_vectors(index_path):
+    """All vectors of a built index; only exact (flat) indexes can give them back"""
+    index = faiss.read_index(os.path.join(index_path, "index.faiss"))
+    if not isinstance(index, faiss.IndexFlat):
+        raise ValueError(f"{index_path} is not a flat index; rebuild it with --index-type flat or use --synthetic")
+    return index.reconstruct_n(0, index.ntotal)
+
+def synthetic_vectors(count, dim, seed):
+    """Clustered unit vectors, roughly shaped like sentence embeddings of a document corpus"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 200, 8), dim))
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.6 * rng.normal(size=(count, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+def make_queries(vectors, count, seed):
+    """Perturbed corpus vectors, so each query has a close but not identical neighbourhood"""
+    rng = np.random.default_rng(seed + 1)
+    picked = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    noise = rng.normal(scale=0.1 * np.linalg.norm(picked, axis=1, keepdims=True).mean() / np.sqrt(vectors.shape[1]), size=picked.shape)
+    return (picked + noise).astype(np.float32)
+
+def search_params(index, nprobes, ef_searches):
+    """(label, parameter name, value) settings to sweep for a built index"""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return [(f"nprobe={value}", "nprobe", value) for value in nprobes]
+    if hasattr(faiss.downcast_index(index), "hnsw"):
+        return [(f"efSearch={value}", "efSearch", value) for value in ef_searches]
+    return [("", None, None)]
+
+def measure(index, queries, k):
+    """Results and per-query latencies in milliseconds, searching one query at a time as the agent does"""
+    # Single-threaded search keeps latencies comparable between configurations
+    threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(1)
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, labels[i] = index.search(query[None, :], k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    faiss.omp_set_num_threads(threads)
+    return labels, latencies
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+def run(vectors, queries, k, index_types, nprobes, ef_searches):
+    count, dim = vectors.shape
+    print(f"{count} vectors of dimension {dim}, {len(queries)} queries, k={k}")
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    truth, _ = measure(exact, queries, k)
+
+    header = f"{'index':<34}{'params':<14}{'recall@' + str(k):>10}{'mean ms':>10}{'p95 ms':>10}{'memory MB':>11}{'build s':>9}"
+    print(header)
+    print("-" * len(header))
+    for index_type in index_types:
+        start = time.perf_counter()
+        try:
+            index = build_index(index_type, vectors)
+        except RuntimeError as e:
+            print(f"{index_type:<34}failed to build: {str(e).splitlines()[0]}")
+            continue
+        build_seconds = time.perf_counter() - start
+        memory = index_memory(index) / 1024 / 1024
+        name = f"{index_type} ({factory_string(index_type, count, dim)})"
+        parameters = faiss.ParameterSpace()
+        for label, parameter, value in search_params(index, nprobes, ef_searches):
+            if parameter:
+                parameters.set_index_parameter(index, parameter, value)
+            found, latencies = measure(index, queries, k)
+            print(
+                f"{name:<34}{label:<14}{recall_at_k(found, truth):>10.3f}{latencies.mean():>10.3f}"
+                f"{np.percentile(latencies, 95):>10.3f}{memory:>11.1f}{build_seconds:>9.2f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare FAISS index types by recall@k against exact search, latency and memory")
+    parser.add_argument("--index", default="./data/indexes", help="Flat index to take vectors from")
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark this many synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=12, help="Neighbours per query (RAGSystem uses 12)")
+    parser.add_argument("--types", default=DEFAULT_TYPES, help="Comma-separated index types; separate with ';' to include faiss.index_factory strings")
+    parser.add_argument("--nprobe", default="1,4,16,64", help="IVF nprobe values to sweep")
+    parser.add_argument("--ef-search", default="16,64,256", help="HNSW efSearch values to sweep")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim, args.seed)
+    else:
+        vectors = load_vectors(args.index)
+    run(
+        vectors,
+        make_queries(vectors, args.queries, args.seed),
+        args.k,
+        [t.strip() for t in args.types.split(";" if ";" in args.types else ",") if t.strip()],
+        [int(v) for v in args.nprobe.split(",")],
+        [int(v) for v in args.ef_search.split(",")]
+    )
@@ -0,0 +1,30 @@
+import os
+import requests
+from dotenv import load_dotenv
+
+# Download the list of active US tickers used by the local symbol index
+def download_listings(output_path, api_key):
+    response = requests.get(
+        "https://www.alphavantage.co/query",
+        params={"function": "LISTING_STATUS", "state": "active", "apikey": api_key},
+        timeout=60
+    )
+    response.raise_for_status()
+    
+    # The endpoint answers with CSV; anything else is an error or rate limit message
+    if not response.text.startswith("symbol,"):
+        raise Exception(f"Unexpected response: {response.text[:200]}")
+    
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as file:
+        file.write(response.text)
+    os.replace(temp_path, output_path)
+    
+    print(f"Saved {response.text.count(chr(10)) - 1} listings to {output_path}")
+
+if __name__ == "__main__":
+    load_dotenv()
+    # The path the symbol index reads from
+    output_path = "./data/listings/listing_status.csv"
+    download_listings(output_path, os.getenv("ALPHA_VANTAGE_API_KEY"))
@@ -0,0 +1,124 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import re
+import threading
+import time
+import uuid
+import numpy as np
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+class EmbeddingCache:
+    """Content-addressed vector store of append-only, memory-mapped NumPy shards
+
+    Each flush writes a shard of vectors plus a matching array of SHA-256
+    text digests. A shard only counts once its keys file exists, and both
+    files are written atomically, so an interrupted run never leaves a
+    partial shard behind. Shard names are unique per write, so indexers
+    sharing a cache directory never overwrite each other's shards.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._rows: Dict[bytes, Tuple[int, int]] = {}
+        self._shards: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        # Names start with a zero-padded timestamp, so they sort in write order
+        names = sorted(name for name in os.listdir(self.root) if re.fullmatch(r"shard-[\w-]+\.keys\.npy", name))
+        for name in names:
+            keys = np.load(os.path.join(self.root, name))
+            vectors = np.load(os.path.join(self.root, name.replace(".keys", "")), mmap_mode="r")
+            shard = len(self._shards)
+            self._shards.append(vectors)
+            for row in range(len(keys)):
+                self._rows[keys[row].tobytes()] = (shard, row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        location = self._rows.get(key)
+        if location is None:
+            return None
+        shard, row = location
+        return self._shards[shard][row]
+
+    def add(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Persist a batch of vectors as a new shard"""
+        if not keys:
+            return
+        with self._lock:
+            number = len(self._shards)
+            path = os.path.join(self.root, f"shard-{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.npy")
+            self._write(path, np.asarray(vectors, dtype=np.float32))
+            # Raw uint8 rows; an S32 array would strip trailing zero bytes from digests
+            self._write(path.replace(".npy", ".keys.npy"), np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, 32))
+            self._shards.append(np.load(path, mmap_mode="r"))
+            for row, key in enumerate(keys):
+                self._rows[key] = (number, row)
+
+    def _write(self, path: str, array: np.ndarray) -> None:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+
+class CachedEmbeddings(Embeddings):
+    """Batched document embedding that only embeds text it has not seen before
+
+    Wraps another Embeddings (the HuggingFace model) and keeps every vector
+    in an EmbeddingCache keyed by the text's hash, one cache directory per
+    model. Batches of misses are embedded on a small thread pool and the
+    cache is flushed every flush_every vectors, so a long run that is
+    interrupted keeps most of its work.
+    """
+    def __init__(self, base: Embeddings, cache_dir: str, model_name: str,
+                 batch_size: int = 64, workers: int = 1, flush_every: int = 4096, progress: bool = True):
+        self.base = base
+        self.cache = EmbeddingCache(os.path.join(cache_dir, model_name.replace("/", "__")))
+        self.batch_size = batch_size
+        self.workers = workers
+        self.flush_every = flush_every
+        self.progress = progress
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(text) for text in texts]
+        pending = {}
+        for key, text in zip(keys, texts):
+            if self.cache.get(key) is None:
+                pending.setdefault(key, text)  # Repeated text is embedded once
+        self.hits += len(texts) - len(pending)
+        self.misses += len(pending)
+        if pending:
+            self._embed_missing(list(pending.items()))
+        return [self.cache.get(key).tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def _embed_missing(self, items: List[Tuple[bytes, str]]) -> None:
+        start = time.monotonic()
+        done = 0
+        for offset in range(0, len(items), self.flush_every):
+            group = items[offset:offset + self.flush_every]
+            batches = [group[i:i + self.batch_size] for i in range(0, len(group), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(lambda batch: self.base.embed_documents([text for _, text in batch]), batches)
+                vectors = [vector for batch_vectors in results for vector in batch_vectors]
+            self.cache.add([key for key, _ in group], np.array(vectors, dtype=np.float32))
+            done += len(group)
+            if self.progress:
+                elapsed = time.monotonic() - start
+                print(f"Embedded {done}/{len(items)} new chunks ({done / max(elapsed, 1e-9):.1f} chunks/sec)")
+
+    def stats(self) -> dict:
+        return {"cached_vectors": len(self.cache), "hits": self.hits, "misses": self.misses}
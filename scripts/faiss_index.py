@@ -0,0 +1,61 @@
+import math
+import faiss
+import numpy as np
+
+# Named index types; anything else is passed to faiss.index_factory as is
+INDEX_TYPES = {
+    "flat": "Exact brute-force search (LangChain's default)",
+    "ivf": "Inverted lists over trained centroids, full vectors",
+    "ivf_sq8": "Inverted lists with 8-bit scalar-quantized vectors",
+    "ivf_pq": "Inverted lists with product-quantized vectors",
+    "hnsw": "HNSW graph over full vectors",
+    "hnsw_sq8": "HNSW graph over 8-bit scalar-quantized vectors"
+}
+
+# FAISS warns below this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+def ivf_lists(count):
+    """Centroid count: about 4 * sqrt(n), capped so every centroid gets enough training points"""
+    return max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CENTROID))
+
+def pq_layout(count, dim):
+    """(sub-quantizers, bits) for PQ: ~8 dimensions per byte, fewer bits on small corpora"""
+    subquantizers = next(m for m in range(max(dim // 8, 1), 0, -1) if dim % m == 0)
+    bits = max(1, min(8, int(math.log2(max(count // MIN_POINTS_PER_CENTROID, 2)))))
+    return subquantizers, bits
+
+def factory_string(index_type, count, dim):
+    """The faiss.index_factory description for an index type and corpus size"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{ivf_lists(count)},Flat"
+    if index_type == "ivf_sq8":
+        return f"IVF{ivf_lists(count)},SQ8"
+    if index_type == "ivf_pq":
+        subquantizers, bits = pq_layout(count, dim)
+        return f"IVF{ivf_lists(count)},PQ{subquantizers}x{bits}"
+    if index_type == "hnsw":
+        return "HNSW32"
+    if index_type == "hnsw_sq8":
+        return "HNSW32,SQ8"
+    return index_type
+
+def build_index(index_type, vectors):
+    """Train (if needed) and fill an L2 index of the given type"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(index_type, count, dim), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    # MMR retrieval reconstructs candidate vectors, which IVF indexes only support with a direct map
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index
+
+def index_memory(index):
+    """Serialized size in bytes, a close proxy for resident memory"""
+    return int(faiss.serialize_index(index).nbytes)
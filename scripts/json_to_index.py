@@ -1,68 +1,335 @@
 import os
+import faiss
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from embedding_engine import CachedEmbeddings
+from faiss_index import INDEX_TYPES, build_index
+import argparse
+import bisect
+import hashlib
 import json
+import shutil
+import tempfile
+import time
+import numpy as np
 
-# Function to read all text files and prepare them for vector embedding
-def load_and_split_texts(text_folder):
+MANIFEST_NAME = "manifest.json"
+
+# Bump when the splitting rules change so existing chunks are not reused
+CHUNKING_VERSION = 1
+
+def _hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def make_splitters():
     # Use different splitters based on content type
     dense_splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=400,
-        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
+        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""],
+        add_start_index=True
     )
-    
+
     regular_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
-        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
+        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""],
+        add_start_index=True
+    )
+    return dense_splitter, regular_splitter
+
+def read_document(file_name, raw):
+    """Parse a processed document into text, metadata and page start offsets
+
+    Handles both the per-page .jsonl output of pdf_to_json (a header line
+    followed by one line per page) and the older single-object .json.
+    """
+    if file_name.endswith('.json'):
+        data = json.loads(raw)
+        return {"text": data["text"], "metadata": data["metadata"], "page_starts": None}
+
+    lines = raw.decode("utf-8").splitlines()
+    header = json.loads(lines[0])
+    parts, page_starts, offset = [], [], 0
+    for line in lines[1:]:
+        page = json.loads(line)
+        page_starts.append((offset, page["page"]))
+        parts.append(page["text"])
+        offset += len(page["text"]) + 1
+    return {"text": "\n".join(parts), "metadata": header["metadata"], "page_starts": page_starts}
+
+def _page_at(page_starts, offsets, position):
+    return page_starts[max(bisect.bisect_right(offsets, position) - 1, 0)][1]
+
+def split_document(data, dense_splitter, regular_splitter):
+    """Split one processed document into chunks and their metadata"""
+    text = data["text"]
+    doc_metadata = data["metadata"]
+    page_starts = data.get("page_starts")
+    offsets = [start for start, _ in page_starts] if page_starts else None
+
+    # Choose splitter based on document type or content
+    is_dense_content = any(term in text.lower()
+        for term in ['financial statement', 'balance sheet', 'income statement'])
+
+    splitter = dense_splitter if is_dense_content else regular_splitter
+    documents = splitter.create_documents([text])
+    chunks = [document.page_content for document in documents]
+
+    metadatas = []
+    for i, (chunk, document) in enumerate(zip(chunks, documents)):
+        chunk_metadata = {
+            **doc_metadata,
+            "chunk_id": i,
+            "total_chunks": len(chunks),
+            "chunk_size": len(chunk),
+            "chunking_strategy": "dense" if is_dense_content else "regular"
+        }
+        if offsets:
+            start = document.metadata["start_index"]
+            chunk_metadata["page"] = _page_at(page_starts, offsets, start)
+            chunk_metadata["page_end"] = _page_at(page_starts, offsets, start + len(chunk) - 1)
+        metadatas.append(chunk_metadata)
+    return chunks, metadatas
+
+def document_files(text_folder):
+    """Processed documents, preferring the .jsonl form where both exist"""
+    names = set(os.listdir(text_folder))
+    return sorted(
+        name for name in names
+        if name.endswith('.jsonl') or (name.endswith('.json') and name + "l" not in names)
     )
-    
+
+# Function to read all text files and prepare them for vector embedding
+def load_and_split_texts(text_folder):
+    dense_splitter, regular_splitter = make_splitters()
     texts = []
     metadatas = []
-    
-    for file_name in os.listdir(text_folder):
-        if file_name.endswith('.json'):
-            with open(os.path.join(text_folder, file_name), "r") as file:
-                data = json.load(file)
-                text = data["text"]
-                doc_metadata = data["metadata"]
-                
-                # Choose splitter based on document type or content
-                is_dense_content = any(term in text.lower() 
-                    for term in ['financial statement', 'balance sheet', 'income statement'])
-                
-                splitter = dense_splitter if is_dense_content else regular_splitter
-                chunks = splitter.split_text(text)
-                
-                # Add chunks and metadata
-                texts.extend(chunks)
-                for i, chunk in enumerate(chunks):
-                    chunk_metadata = {
-                        **doc_metadata,
-                        "chunk_id": i,
-                        "total_chunks": len(chunks),
-                        "chunk_size": len(chunk),
-                        "chunking_strategy": "dense" if is_dense_content else "regular"
-                    }
-                    metadatas.append(chunk_metadata)
-    
+
+    for file_name in document_files(text_folder):
+        with open(os.path.join(text_folder, file_name), "rb") as file:
+            data = read_document(file_name, file.read())
+        chunks, chunk_metadatas = split_document(data, dense_splitter, regular_splitter)
+        texts.extend(chunks)
+        metadatas.extend(chunk_metadatas)
+
     return texts, metadatas
 
+def load_manifest(index_path, embedding_model):
+    """The manifest of the existing index, or None if it must be rebuilt"""
+    manifest_path = os.path.join(index_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("embedding_model") != embedding_model or manifest.get("chunking_version") != CHUNKING_VERSION:
+        print("Embedding model or chunking changed; rebuilding the index")
+        return None
+    return manifest
+
+def _existing_vectors(vector_store):
+    """Map docstore id to position in the FAISS index"""
+    if vector_store is None:
+        return {}
+    return {doc_id: position for position, doc_id in vector_store.index_to_docstore_id.items()}
+
+def _reuse_vector(vector_store, positions, chunk_id):
+    """The stored vector for a chunk, or None if the index cannot reconstruct it exactly"""
+    position = positions.get(chunk_id)
+    if position is None or not isinstance(vector_store.index, faiss.IndexFlat):
+        return None
+    try:
+        return vector_store.index.reconstruct(position).tolist()
+    except RuntimeError:
+        return None
+
+# Builds kept next to the live one, so readers still loading the previous build can finish
+KEPT_VERSIONS = 2
+
+def _save_atomically(vector_store, manifest, index_path):
+    """Write the index and manifest to a new versioned directory and point index_path at it
+
+    index_path is a symlink to the current build. Replacing a symlink is
+    atomic, so readers always open either the previous or the new build.
+    """
+    versions = f"{os.path.abspath(index_path)}.versions"
+    os.makedirs(versions, exist_ok=True)
+    build_path = tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=versions)
+    os.chmod(build_path, 0o755)  # mkdtemp makes it private to this user
+    vector_store.save_local(build_path)
+    with open(os.path.join(build_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+
+    if os.path.isdir(index_path) and not os.path.islink(index_path):
+        # One-time move of an index built before versioning; readers may miss it for a moment
+        os.replace(index_path, os.path.join(versions, "legacy"))
+    link_path = f"{os.path.abspath(index_path)}.link-{os.getpid()}"
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.relpath(build_path, os.path.dirname(os.path.abspath(index_path))), link_path)
+    os.replace(link_path, index_path)
+
+    builds = sorted((os.path.join(versions, name) for name in os.listdir(versions)), key=os.path.getmtime)
+    for old in builds[:-KEPT_VERSIONS]:
+        if old != build_path:
+            shutil.rmtree(old, ignore_errors=True)
+
+def _build_vector_store(texts, vectors, metadatas, ids, embeddings, index_type):
+    """A LangChain FAISS store over a freshly built index of the given type"""
+    index = build_index(index_type, np.asarray(vectors, dtype=np.float32))
+    docstore = InMemoryDocstore({
+        chunk_id: Document(page_content=text, metadata=metadata)
+        for chunk_id, text, metadata in zip(ids, texts, metadatas)
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+def update_faiss_index(text_folder, index_path, embedding_model='sentence-transformers/all-MiniLM-L6-v2', full=False,
+                       cache_dir="./data/embeddings", batch_size=64, workers=1, index_type="flat"):
+    """Bring the index in line with the processed documents, embedding only new or changed chunks
+
+    Approximate index types need retraining as the corpus changes and do not
+    all support removal, so the index structure is rebuilt from stored
+    vectors on every update; only new text is embedded.
+    """
+    start = time.monotonic()
+    manifest = None if full else load_manifest(index_path, embedding_model)
+    # Vectors are cached by chunk text, so rebuilds and splitter experiments only embed new text
+    embeddings = CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=embedding_model, encode_kwargs={"batch_size": batch_size}),
+        cache_dir,
+        embedding_model,
+        batch_size=batch_size,
+        workers=workers
+    )
+
+    vector_store = None
+    if manifest is not None:
+        vector_store = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    else:
+        manifest = {"documents": {}}
+    previous = manifest["documents"]
+    positions = _existing_vectors(vector_store)
+
+    # Chunks present anywhere in the old index can reuse their vectors
+    known_chunks = {
+        chunk["hash"]: chunk["id"]
+        for document in previous.values()
+        for chunk in document["chunks"]
+    }
+
+    dense_splitter, regular_splitter = make_splitters()
+    documents = {}
+    stale_ids = []
+    texts, metadatas, ids, vectors = [], [], [], []
+    unchanged = 0
+
+    for file_name in document_files(text_folder):
+        with open(os.path.join(text_folder, file_name), "rb") as file:
+            raw = file.read()
+        doc_hash = _hash(raw)
+        if file_name in previous and previous[file_name]["hash"] == doc_hash:
+            documents[file_name] = previous[file_name]
+            unchanged += 1
+            continue
+
+        if file_name in previous:
+            stale_ids.extend(chunk["id"] for chunk in previous[file_name]["chunks"])
+        chunks, chunk_metadatas = split_document(read_document(file_name, raw), dense_splitter, regular_splitter)
+        entries = []
+        for i, (chunk, chunk_metadata) in enumerate(zip(chunks, chunk_metadatas)):
+            chunk_hash = _hash(chunk)
+            chunk_id = f"{file_name}:{i}"
+            texts.append(chunk)
+            metadatas.append(chunk_metadata)
+            ids.append(chunk_id)
+            vectors.append(_reuse_vector(vector_store, positions, known_chunks.get(chunk_hash)))
+            entries.append({"id": chunk_id, "hash": chunk_hash})
+        documents[file_name] = {"hash": doc_hash, "chunks": entries}
+
+    deleted = [name for name in previous if name not in documents]
+    for file_name in deleted:
+        stale_ids.extend(chunk["id"] for chunk in previous[file_name]["chunks"])
+
+    if not texts and not stale_ids and vector_store is not None and manifest.get("index_type", "flat") == index_type:
+        print(f"Index is up to date ({unchanged} documents)")
+        return
+
+    new_chunks = len(texts)
+
+    # Carry over the chunks of unchanged documents, in their existing order
+    if vector_store is not None:
+        stale = set(stale_ids)
+        kept_ids = [
+            vector_store.index_to_docstore_id[position]
+            for position in sorted(vector_store.index_to_docstore_id)
+            if vector_store.index_to_docstore_id[position] not in stale
+        ]
+        kept = [vector_store.docstore.search(chunk_id) for chunk_id in kept_ids]
+        texts = [document.page_content for document in kept] + texts
+        metadatas = [document.metadata for document in kept] + metadatas
+        vectors = [_reuse_vector(vector_store, positions, chunk_id) for chunk_id in kept_ids] + vectors
+        ids = kept_ids + ids
+
+    # Embed only the chunks whose vectors could not be reused
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        for i, vector in zip(missing, embeddings.embed_documents([texts[i] for i in missing])):
+            vectors[i] = vector
+
+    if texts:
+        vector_store = _build_vector_store(texts, vectors, metadatas, ids, embeddings, index_type)
+    else:
+        # Save an empty index so deleted documents stop being retrieved; only flat indexes need no training
+        print(f"No documents found in {text_folder}; saving an empty index")
+        dim = vector_store.index.d if vector_store is not None else len(embeddings.embed_query("dimension"))
+        index_type = "flat"
+        vector_store = _build_vector_store([], np.empty((0, dim), dtype=np.float32), [], [], embeddings, index_type)
+
+    manifest = {
+        "embedding_model": embedding_model,
+        "chunking_version": CHUNKING_VERSION,
+        "index_type": index_type,
+        "documents": documents
+    }
+    _save_atomically(vector_store, manifest, index_path)
+    print(
+        f"FAISS {index_type} index saved to {index_path}: {len(documents) - unchanged} documents updated, "
+        f"{unchanged} unchanged, {len(deleted)} removed; {new_chunks} new chunks, "
+        f"{embeddings.misses} embedded and {embeddings.hits} from the embedding cache in {time.monotonic() - start:.1f}s"
+    )
+
 # Create FAISS index from text files
 def create_faiss_index(text_folder, index_path, embedding_model='sentence-transformers/all-MiniLM-L6-v2'):
-    texts, metadatas = load_and_split_texts(text_folder)
-    embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
-    vector_store = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
-
-    # Save the FAISS index to disk
-    vector_store.save_local(index_path)
-    print(f"FAISS index saved to {index_path}")
+    update_faiss_index(text_folder, index_path, embedding_model, full=True)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the FAISS index from processed documents")
+    parser.add_argument("--full", action="store_true", help="Rebuild the index from every document instead of only changed ones")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=1, help="Embedding batches run concurrently")
+    parser.add_argument(
+        "--index-type",
+        default="flat",
+        help=f"One of {', '.join(INDEX_TYPES)}, or a faiss.index_factory string"
+    )
+    parser.add_argument("--cache-dir", default="./data/embeddings", help="Where embedded chunk vectors are cached")
+    args = parser.parse_args()
+
     # The folder where text files are saved
     text_folder = "./data/processed"
     # The path where you want to save the FAISS index
     index_path = "./data/indexes"
-    create_faiss_index(text_folder, index_path)
+    update_faiss_index(
+        text_folder,
+        index_path,
+        full=args.full,
+        cache_dir=args.cache_dir,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        index_type=args.index_type
+    )
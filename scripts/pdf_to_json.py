@@ -1,53 +1,163 @@
 import os
 import fitz  # PyMuPDF for reading PDFs
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import shutil
+import time
 
+# Large filings are split into page ranges so one document can use several cores
+PAGES_PER_TASK = 32
 
-# Function to convert PDF to text and save as .txt files
-def convert_pdfs_to_text(pdf_folder, text_folder):
+def clean_text(text):
+    # Add better text cleaning
+    return text.replace('\n\n', ' ').replace('  ', ' ')
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_header(path):
+    """The first line of a converted document, or None if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+def is_unchanged(pdf_path, output_path):
+    """Whether output_path was converted from the current contents of pdf_path"""
+    header = read_header(output_path)
+    if not header or "source" not in header:
+        return False
+    source = header["source"]
+    stat = os.stat(pdf_path)
+    if source.get("size") == stat.st_size and source.get("mtime") == stat.st_mtime:
+        return True
+    # A touched but identical file does not need converting again
+    return source.get("size") == stat.st_size and source.get("sha256") == file_hash(pdf_path)
+
+def extract_pages(pdf_path, start, end, part_path):
+    """Write pages [start, end) of a PDF to part_path, one JSON line per page"""
+    with fitz.open(pdf_path) as doc, open(part_path, "w", encoding="utf-8") as out:
+        for number in range(start, end):
+            text = clean_text(doc[number].get_text())
+            out.write(json.dumps({"page": number + 1, "text": text}) + "\n")
+    return end - start
+
+def _assemble(output_path, header, part_paths):
+    """Join the page parts behind the header and move the result into place"""
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as out:
+        out.write(json.dumps(header) + "\n")
+        for part_path in part_paths:
+            with open(part_path, "r", encoding="utf-8") as part:
+                shutil.copyfileobj(part, out)
+    os.replace(temp_path, output_path)
+
+def _remove(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+# Function to convert PDFs to line-oriented JSON with one record per page
+def convert_pdfs_to_text(pdf_folder, text_folder, workers=None, force=False):
     # Create the folder for text files if it doesn't exist
     if not os.path.exists(text_folder):
         os.makedirs(text_folder)
 
-    # Loop through all the PDF files in the folder
-    for file_name in os.listdir(pdf_folder):
-        if file_name.endswith(".pdf"):
-            file_path = os.path.join(pdf_folder, file_name)
-            text_file_name = os.path.splitext(file_name)[0] + ".txt"
-            text_file_path = os.path.join(text_folder, text_file_name)
-
-            # Open PDF and extract text
-            with fitz.open(file_path) as doc:
-                text = ""
-                for page in doc:
-                    text += page.get_text()
+    start_time = time.monotonic()
+    jobs = {}
+    skipped = 0
+    for file_name in sorted(os.listdir(pdf_folder)):
+        if not file_name.endswith(".pdf"):
+            continue
+        file_path = os.path.join(pdf_folder, file_name)
+        stem = os.path.splitext(file_name)[0]
+        output_path = os.path.join(text_folder, stem + ".jsonl")
+        if not force and is_unchanged(file_path, output_path):
+            skipped += 1
+            continue
 
-            # Add metadata extraction
+        # Metadata and page count are cheap to read up front
+        with fitz.open(file_path) as doc:
+            page_count = doc.page_count
             metadata = {
                 "title": doc.metadata.get("title", ""),
                 "author": doc.metadata.get("author", ""),
                 "creation_date": doc.metadata.get("creationDate", ""),
                 "source_file": file_name
             }
+        stat = os.stat(file_path)
+        header = {
+            "metadata": metadata,
+            "pages": page_count,
+            "source": {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_hash(file_path)}
+        }
+        ranges = [(first, min(first + PAGES_PER_TASK, page_count)) for first in range(0, page_count, PAGES_PER_TASK)]
+        jobs[file_name] = {
+            "path": file_path,
+            "output_path": output_path,
+            "legacy_path": os.path.join(text_folder, stem + ".json"),
+            "header": header,
+            "parts": [f"{output_path}.part{i}" for i in range(len(ranges))],
+            "ranges": ranges,
+            "remaining": len(ranges),
+            "failed": False
+        }
 
-            # Add better text cleaning
-            text = text.replace('\n\n', ' ').replace('  ', ' ')
+    total_pages = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for file_name, job in jobs.items():
+            if not job["ranges"]:
+                job["remaining"] = 0
+                _assemble(job["output_path"], job["header"], [])
+                continue
+            for (first, last), part_path in zip(job["ranges"], job["parts"]):
+                futures[pool.submit(extract_pages, job["path"], first, last, part_path)] = file_name
 
-            # Save both text and metadata
-            output = {
-                "text": text,
-                "metadata": metadata
-            }
-
-            # Save as JSON to preserve metadata
-            with open(text_file_path.replace('.txt', '.json'), "w", encoding="utf-8") as f:
-                json.dump(output, f)
-            print(f"Converted {file_name} to {text_file_name}")
+        for future in as_completed(futures):
+            file_name = futures[future]
+            job = jobs[file_name]
+            job["remaining"] -= 1
+            try:
+                total_pages += future.result()
+            except Exception as e:
+                if not job["failed"]:
+                    print(f"Failed to convert {file_name}: {str(e)}")
+                job["failed"] = True
+            if job["remaining"]:
+                continue
+            if job["failed"]:
+                failed += 1
+            else:
+                _assemble(job["output_path"], job["header"], job["parts"])
+                # The single-blob .json format is superseded by the .jsonl output
+                _remove([job["legacy_path"]])
+                print(f"Converted {file_name} ({job['header']['pages']} pages)")
+            _remove(job["parts"])
 
+    elapsed = time.monotonic() - start_time
+    rate = total_pages / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Converted {len(jobs) - failed} PDFs ({total_pages} pages) in {elapsed:.1f}s, "
+        f"{rate:.1f} pages/sec; {skipped} unchanged, {failed} failed"
+    )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract PDF text to one JSON line per page")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="Convert every PDF, even unchanged ones")
+    args = parser.parse_args()
+
     # Specify the folder with your PDFs
     pdf_folder = "./data/documents"
-    # Specify the folder where you want to save .txt files
+    # Specify the folder where you want to save the converted documents
     text_folder = "./data/processed"
-    convert_pdfs_to_text(pdf_folder, text_folder)
+    convert_pdfs_to_text(pdf_folder, text_folder, workers=args.workers, force=args.force)
@@ -0,0 +1,119 @@
+from aiohttp import web
+import argparse
+import asyncio
+import json
+from main import ExpertSystem, configure_provider
+from utils import metrics
+from utils.callbacks import QueueHandler
+from utils.metrics import RequestMetrics
+from utils.config import Config
+from utils.workpad import Workpad
+
+# Marks the end of a request's token stream
+_DONE = object()
+
+async def _send_event(response: web.StreamResponse, event: str, data: dict) -> None:
+    """Write one server-sent event"""
+    payload = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    await response.write(payload.encode("utf-8"))
+
+async def handle_query(request: web.Request) -> web.StreamResponse:
+    """Answer a query, streaming synthesis tokens as server-sent events"""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return web.json_response({"error": "Request body must be JSON"}, status=400)
+    if not isinstance(body, dict):
+        return web.json_response({"error": "Request body must be a JSON object"}, status=400)
+    query = str(body.get("query", "")).strip()
+    if not query:
+        return web.json_response({"error": "Missing 'query'"}, status=400)
+
+    system: ExpertSystem = request.app["system"]
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    # Per-request state; LLM clients, tools and caches are shared via the system
+    workpad = Workpad()
+    handler = QueueHandler(queue, loop)
+    request_metrics = RequestMetrics()
+
+    async def run() -> str:
+        try:
+            async with request.app["slots"]:
+                return await system.meta_agent.aprocess(
+                    query, workpad=workpad, callbacks=[handler], request_metrics=request_metrics
+                )
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    await response.prepare(request)
+    task = asyncio.create_task(run())
+
+    try:
+        while True:
+            token = await queue.get()
+            if token is _DONE:
+                break
+            await _send_event(response, "token", {"token": token})
+
+        answer = await task
+        await _send_event(response, "done", {
+            "answer": answer,
+            "agents": workpad.get_all_content(),
+            "metrics": request_metrics.to_dict()
+        })
+    except ConnectionResetError:
+        # Client went away; the finally below stops work on its answer
+        return response
+    except Exception as e:
+        await _send_event(response, "error", {"message": str(e)})
+    finally:
+        # Also reached when aiohttp cancels the handler on disconnect, so the
+        # request never keeps a slot or spends LLM and API budget unobserved
+        if not task.done():
+            task.cancel()
+
+    await response.write_eof()
+    return response
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Expose aggregated request metrics for Prometheus"""
+    return web.Response(text=metrics.registry.render_prometheus(), content_type="text/plain")
+
+async def handle_health(request: web.Request) -> web.Response:
+    """Report readiness for the load balancer"""
+    system: ExpertSystem = request.app["system"]
+    return web.json_response({
+        "status": "ok",
+        "agents": system.meta_agent.registry.list_agents()
+    })
+
+def create_app(system: ExpertSystem) -> web.Application:
+    """Build the HTTP application around a shared expert system"""
+    app = web.Application()
+    app["system"] = system
+    app["slots"] = asyncio.Semaphore(Config.server_config.max_concurrent_requests)
+    app.router.add_post("/query", handle_query)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Expert Agent System over HTTP")
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "groq", "fake"])
+    parser.add_argument("--host", default=Config.server_config.host)
+    parser.add_argument("--port", type=int, default=Config.server_config.port)
+    args = parser.parse_args()
+
+    configure_provider(args.provider)
+    system = ExpertSystem(streaming=False)
+    web.run_app(create_app(system), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.article_tools import ArticleReader
+from utils.cache import TieredCache
+from utils.config import Config
+
+PARAGRAPH = "Quarterly revenue grew on strong demand for data center chips and software. "
+
+ARTICLE_PAGE = f"""<!doctype html>
+<html><head><title>Chip maker beats estimates</title><script>var tracking = "{PARAGRAPH}";</script></head>
+<body>
+<nav><p>Markets | Technology | Opinion | Subscribe to our newsletter for daily updates</p></nav>
+<article>
+<h2>Results</h2>
+<p>{PARAGRAPH}</p>
+<p>Guidance for the next quarter was raised above what analysts had expected.</p>
+</article>
+<footer><p>Copyright 2024 Example Media. All rights reserved. Terms of use apply.</p></footer>
+</body></html>""".encode()
+
+def long_page(paragraphs: int) -> bytes:
+    body = "".join(f"<p>Paragraph {i}: {PARAGRAPH}</p>\n" for i in range(paragraphs))
+    return f"<html><head><title>Long</title></head><body><article>{body}</article></body></html>".encode()
+
+class PageHandler(BaseHTTPRequestHandler):
+    hits = Counter()
+
+    def do_GET(self):
+        PageHandler.hits[self.path] += 1
+        if self.path.startswith("/slow"):
+            # Close-delimited body dripped out a paragraph at a time
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html><head><title>Slow</title></head><body><article>")
+            for i in range(40):
+                self.wfile.write(f"<p>Paragraph {i}: {PARAGRAPH}</p>".encode())
+                self.wfile.flush()
+                time.sleep(0.1)
+            return
+        body = long_page(2000) if self.path.startswith("/long") else ARTICLE_PAGE
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+@pytest.fixture
+def reader(monkeypatch):
+    monkeypatch.setattr(Config, "article_config", replace(
+        Config.article_config,
+        max_bytes=16 * 1024,
+        page_timeout=0.8,
+        total_timeout=3.0,
+        cache_ttl=0.5,
+        max_chars_per_article=10 ** 6,
+        persist=False
+    ))
+    PageHandler.hits.clear()
+    return ArticleReader(url_filter=lambda url: True, cache=TieredCache(None))
+
+def read_one(reader, url):
+    passages = reader.read([{"link": url}], "revenue guidance")
+    assert len(passages) == 1
+    return passages[0]
+
+def test_strips_boilerplate(server, reader):
+    article = read_one(reader, f"{server}/article")
+    assert article["title"] == "Chip maker beats estimates"
+    assert PARAGRAPH.strip() in article["passages"]
+    assert "Guidance for the next quarter" in article["passages"]
+    for boilerplate in ("tracking", "Subscribe", "Copyright"):
+        assert boilerplate not in article["passages"]
+
+def test_stops_at_byte_limit(server, reader):
+    article = read_one(reader, f"{server}/long")
+    paragraphs = article["passages"].split("\n")
+    assert "Paragraph 0:" in paragraphs[0]
+    # 2000 paragraphs are served; only what fits in max_bytes is read
+    assert len(paragraphs) < 16 * 1024 // len(PARAGRAPH)
+    assert "Paragraph 1999:" not in article["passages"]
+
+def test_stops_at_time_limit(server, reader):
+    start = time.monotonic()
+    article = read_one(reader, f"{server}/slow")
+    elapsed = time.monotonic() - start
+    # The page takes 4 seconds to send; reading stops after page_timeout
+    assert elapsed < 2.0
+    assert "Paragraph 0:" in article["passages"]
+    assert "Paragraph 39:" not in article["passages"]
+
+def test_caches_articles_until_ttl(server, reader):
+    url = f"{server}/cached"
+    first = read_one(reader, url)
+    assert read_one(reader, url) == first
+    assert PageHandler.hits["/cached"] == 1
+
+    time.sleep(0.6)
+    read_one(reader, url)
+    assert PageHandler.hits["/cached"] == 2
+
+def test_async_read_shares_cache(server, reader):
+    url = f"{server}/shared"
+    first = read_one(reader, url)
+    passages = asyncio.run(reader.aread([{"link": url}], "revenue guidance"))
+    assert passages == [first]
+    assert PageHandler.hits["/shared"] == 1
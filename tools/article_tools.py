@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import re
+import time
+from bs4 import BeautifulSoup
+from tools.http_client import create_transport
+from utils import metrics
+from utils.cache import DiskCache, TieredCache
+from utils.config import Config
+
+# Elements that never hold article text
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg", "button"]
+
+def extract_article(html: str) -> Dict[str, str]:
+    """Strip boilerplate and return the page title and main text, one paragraph per line"""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    # Prefer explicit article containers, falling back to the whole body
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    paragraphs = []
+    for element in root.find_all(["p", "h2", "h3", "li"]):
+        text = re.sub(r"\s+", " ", element.get_text(" ", strip=True))
+        # Short fragments are usually captions, bylines or link lists
+        if len(text) >= 40 or (element.name in ("h2", "h3") and text):
+            paragraphs.append(text)
+    return {"title": title, "text": "\n".join(dict.fromkeys(paragraphs))}
+
+def select_passages(text: str, query: str, max_chars: int) -> str:
+    """Keep the paragraphs that best match the query, in their original order"""
+    terms = {w for w in re.findall(r"[a-z0-9]+", query.lower()) if len(w) > 2}
+    paragraphs = [p for p in text.split("\n") if p]
+    scored = sorted(
+        range(len(paragraphs)),
+        key=lambda i: (-sum(term in paragraphs[i].lower() for term in terms), i)
+    )
+    chosen, used = set(), 0
+    for i in scored:
+        if used + len(paragraphs[i]) > max_chars and chosen:
+            continue
+        chosen.add(i)
+        used += len(paragraphs[i])
+        if used >= max_chars:
+            break
+    return "\n".join(paragraphs[i][:max_chars] for i in sorted(chosen))
+
+class ArticleReader:
+    """Fetches result pages concurrently and extracts their main text
+
+    Each page is limited in bytes and time, and extracted articles are
+    cached by URL. Failed pages are cached briefly so they are not retried
+    on every query.
+    """
+    def __init__(self, url_filter: Optional[Callable[[str], bool]] = None, cache: Optional[TieredCache] = None):
+        self.config = Config.article_config
+        self.url_filter = url_filter
+        if cache is None:
+            disk = DiskCache(self.config.cache_path, max_entries=self.config.cache_max_entries) if self.config.persist else None
+            cache = TieredCache(disk, memory_entries=self.config.memory_entries)
+        self.cache = cache
+        self.http = create_transport("articles", read_timeout=self.config.page_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="article")
+
+    def read(self, results: List[Dict], query: str) -> List[Dict]:
+        """Deep-read the top results, returning title, link and passages for each page that worked"""
+        urls = self._select_urls(results)
+        if not urls:
+            return []
+        with metrics.stage("web.deep_read"):
+            deadline = time.monotonic() + self.config.total_timeout
+            futures = [self._executor.submit(metrics.bind(self._get_article), url, deadline) for url in urls]
+            done, _ = wait(futures, timeout=self.config.total_timeout)
+            articles = [future.result() if future in done else None for future in futures]
+        return self._passages(urls, articles, query)
+
+    async def aread(self, results: List[Dict], query: str) -> List[Dict]:
+        """Async variant of read"""
+        urls = self._select_urls(results)
+        if not urls:
+            return []
+        with metrics.stage("web.deep_read"):
+            deadline = time.monotonic() + self.config.total_timeout
+            articles = await asyncio.gather(
+                *(asyncio.wait_for(self._aget_article(url, deadline), self.config.total_timeout) for url in urls),
+                return_exceptions=True
+            )
+        return self._passages(urls, [a if isinstance(a, dict) else None for a in articles], query)
+
+    def _select_urls(self, results: List[Dict]) -> List[str]:
+        urls = [r["link"] for r in results if r.get("link")]
+        if self.url_filter is not None:
+            urls = [url for url in urls if self.url_filter(url)]
+        return list(dict.fromkeys(urls))[:self.config.top_n]
+
+    def _passages(self, urls: List[str], articles: List[Optional[Dict]], query: str) -> List[Dict]:
+        passages = []
+        for url, article in zip(urls, articles):
+            if not article or not article.get("text"):
+                continue
+            passages.append({
+                "title": article["title"],
+                "link": url,
+                "passages": select_passages(article["text"], query, self.config.max_chars_per_article)
+            })
+        return passages
+
+    def _get_article(self, url: str, deadline: float) -> Optional[Dict]:
+        cached = self._get_cached(url)
+        if cached is not None:
+            return cached
+        deadline = min(deadline, time.monotonic() + self.config.page_timeout)
+        try:
+            body, content_type = self.http.fetch_limited(url, self.config.max_bytes, deadline, headers=self._headers())
+            return self._store(url, body, content_type)
+        except Exception as e:
+            return self._store_failure(url, e)
+
+    async def _aget_article(self, url: str, deadline: float) -> Optional[Dict]:
+        # Disk cache reads/writes and HTML parsing block, so they run off the event loop
+        cached = await asyncio.to_thread(self._get_cached, url)
+        if cached is not None:
+            return cached
+        deadline = min(deadline, time.monotonic() + self.config.page_timeout)
+        try:
+            body, content_type = await self.http.afetch_limited(url, self.config.max_bytes, deadline, headers=self._headers())
+            return await asyncio.to_thread(self._store, url, body, content_type)
+        except Exception as e:
+            return await asyncio.to_thread(self._store_failure, url, e)
+
+    def _headers(self) -> Dict:
+        return {"User-Agent": self.config.user_agent, "Accept": "text/html,application/xhtml+xml"}
+
+    def _get_cached(self, url: str) -> Optional[Dict]:
+        article = self.cache.get(f"article:{url}")
+        metrics.incr("article_cache.miss" if article is None else "article_cache.hit")
+        return article
+
+    def _store(self, url: str, body: bytes, content_type: str) -> Dict:
+        if "html" not in content_type and not body.lstrip()[:15].lower().startswith((b"<!doctype", b"<html")):
+            raise Exception(f"Unsupported content type {content_type}")
+        article = extract_article(body.decode("utf-8", errors="replace"))
+        article["text"] = article["text"][:self.config.max_stored_chars]
+        self.cache.set(f"article:{url}", article, self.config.cache_ttl)
+        return article
+
+    def _store_failure(self, url: str, error: Exception) -> Dict:
+        logging.info(f"Deep read of {url} failed: {str(error)}")
+        metrics.incr("article.error")
+        article = {"title": "", "text": ""}
+        self.cache.set(f"article:{url}", article, self.config.failure_ttl)
+        return article
@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import httpx
+from utils.config import Config
+
+# Fake responses link to trusted domains so the search filter keeps them
+FAKE_DOMAINS = ["reuters.com", "cnbc.com", "marketwatch.com", "finance.yahoo.com", "fool.com"]
+
+def _rng(*parts: str) -> random.Random:
+    """Seeded by the request, so the same request always gets the same answer"""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+def _base_price(symbol: str) -> float:
+    return round(_rng("price", symbol).uniform(10, 900), 2)
+
+def _business_days(count: int) -> List[date]:
+    """The last count weekdays up to today, oldest first"""
+    days, day = [], date.today()
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60] or "markets"
+
+def alpha_vantage_response(params: Dict) -> Dict:
+    """A correctly shaped Alpha Vantage response for the requested function"""
+    function, symbol = params.get("function"), str(params.get("symbol", "")).upper()
+    if function == "GLOBAL_QUOTE":
+        rng = _rng("quote", symbol, date.today().isoformat())
+        return {"Global Quote": {
+            "01. symbol": symbol,
+            "05. price": f"{_base_price(symbol) * rng.uniform(0.97, 1.03):.2f}",
+            "06. volume": str(rng.randint(100_000, 50_000_000)),
+            "07. latest trading day": _business_days(1)[0].isoformat(),
+            "10. change percent": f"{rng.uniform(-3, 3):.4f}%"
+        }}
+    if function == "OVERVIEW":
+        rng = _rng("overview", symbol)
+        eps = rng.uniform(0.5, 20)
+        return {
+            "Symbol": symbol,
+            "MarketCapitalization": str(rng.randint(1, 3000) * 10 ** 9),
+            "PERatio": f"{_base_price(symbol) / eps:.2f}",
+            "EPS": f"{eps:.2f}"
+        }
+    if function == "TIME_SERIES_DAILY":
+        rng = _rng("daily", symbol)
+        close, bars = _base_price(symbol), {}
+        for day in _business_days(100 if params.get("outputsize") != "full" else 1000):
+            open_ = close
+            close = max(1.0, close * (1 + rng.gauss(0, 0.015)))
+            bars[day.isoformat()] = {
+                "1. open": f"{open_:.2f}",
+                "2. high": f"{max(open_, close) * 1.01:.2f}",
+                "3. low": f"{min(open_, close) * 0.99:.2f}",
+                "4. close": f"{close:.2f}",
+                "5. volume": str(rng.randint(100_000, 50_000_000))
+            }
+        return {"Meta Data": {"2. Symbol": symbol}, "Time Series (Daily)": bars}
+    if function == "REALTIME_BULK_QUOTES":
+        data = []
+        for item in symbol.split(","):
+            quote = alpha_vantage_response({"function": "GLOBAL_QUOTE", "symbol": item})["Global Quote"]
+            data.append({
+                "symbol": item,
+                "timestamp": quote["07. latest trading day"],
+                "close": quote["05. price"],
+                "volume": quote["06. volume"],
+                "change_percent": quote["10. change percent"].rstrip("%")
+            })
+        return {"message": "", "data": data}
+    return {"Meta Data": {"1. Information": f"Simulated {function} for {symbol}"}}
+
+def serper_response(payload: Dict) -> Dict:
+    """Organic results on trusted domains, linking to pages the articles transport serves"""
+    query = str(payload.get("q", ""))
+    rng = _rng("search", query)
+    organic = []
+    for position in range(1, int(payload.get("num", 10)) + 1):
+        domain = rng.choice(FAKE_DOMAINS)
+        organic.append({
+            "title": f"{query.title()} - coverage {position}",
+            "link": f"https://www.{domain}/markets/{_slug(query)}-{position}",
+            "snippet": f"Simulated result {position} about {query}.",
+            "date": f"{rng.randint(1, 23)} hours ago",
+            "position": position
+        })
+    return {"searchParameters": {"q": query}, "organic": organic}
+
+def article_page(url: str) -> bytes:
+    """An article page with some boilerplate around the text"""
+    rng = _rng("article", url)
+    topic = urlparse(url).path.rsplit("/", 1)[-1].replace("-", " ")
+    paragraphs = "".join(
+        f"<p>{topic.capitalize()}: simulated paragraph {i} on "
+        f"{', '.join(rng.sample(['earnings', 'guidance', 'demand', 'margins', 'valuation', 'rates'], 3))}.</p>"
+        for i in range(rng.randint(4, 10))
+    )
+    return (
+        f"<!doctype html><html><head><title>{topic.title()}</title></head><body>"
+        f"<nav><p>Markets | Business | Subscribe</p></nav><article><h2>{topic.title()}</h2>{paragraphs}</article>"
+        f"<footer><p>Simulated page for offline benchmarking.</p></footer></body></html>"
+    ).encode("utf-8")
+
+class FakeTransport:
+    """Drop-in for HTTPTransport that answers locally with canned responses
+
+    Used with the fake provider so the whole pipeline runs without API keys
+    or a network. Responses are deterministic per request and arrive after
+    a simulated latency (FAKE_TOOL_LATENCY). Counters mirror HTTPTransport.
+    """
+    def __init__(self, name: str, **kwargs):
+        self.name = name
+        self.latency = Config.api_config.fake_tool_latency
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _respond(self, method: str, url: str, params: Dict = None, json: Dict = None) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+        request = httpx.Request(method, url)
+        if self.name == "alpha_vantage":
+            return httpx.Response(200, json=alpha_vantage_response(params or {}), request=request)
+        if self.name == "serper":
+            return httpx.Response(200, json=serper_response(json or {}), request=request)
+        return httpx.Response(200, content=article_page(url), headers={"Content-Type": "text/html"}, request=request)
+
+    def _delay(self, url: str) -> float:
+        return self.latency * _rng("latency", url, str(time.monotonic())).uniform(0.5, 1.5)
+
+    def request(self, method: str, url: str, params: Dict = None, json: Dict = None, **kwargs) -> httpx.Response:
+        time.sleep(self._delay(url))
+        return self._respond(method, url, params, json)
+
+    async def arequest(self, method: str, url: str, params: Dict = None, json: Dict = None, **kwargs) -> httpx.Response:
+        await asyncio.sleep(self._delay(url))
+        return self._respond(method, url, params, json)
+
+    def fetch_limited(self, url: str, max_bytes: int, deadline: float, **kwargs) -> Tuple[bytes, str]:
+        response = self.request("GET", url)
+        return response.content[:max_bytes], response.headers["Content-Type"]
+
+    async def afetch_limited(self, url: str, max_bytes: int, deadline: float, **kwargs) -> Tuple[bytes, str]:
+        response = await self.arequest("GET", url)
+        return response.content[:max_bytes], response.headers["Content-Type"]
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": 0,
+                "retries": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "max_in_flight": 0,
+                "http2": False
+            }
@@ -1,106 +1,516 @@
+from tools.http_client import create_transport
+from tools.price_store import PriceStore
+from tools.rate_limit import TokenBucket
+from utils import metrics
+from utils.cache import DiskCache, TieredCache
 from utils.config import Config
-from datetime import datetime, timedelta
+from utils.singleflight import flights
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import logging
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import threading
+import time
+import numpy as np
 
 
 class VantageFinanceTool:
     def __init__(self):
         self.api_key = Config.api_config.alpha_vantage_key
-        if not self.api_key:
+        if not self.api_key and not Config.api_config.fake_tools:
             raise ValueError("ALPHA_VANTAGE_API_KEY not found in environment variables")
         
         self.base_url = "https://www.alphavantage.co/query"
-        self.session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5)
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
-        self._cache = {}
-        self._cache_expiry = {}
-        self.cache_duration = timedelta(minutes=15)  # Cache data for 15 minutes
-
-    def _get_cached_data(self, symbol: str):
-        """Get cached data if available and not expired"""
-        now = datetime.now()
-        if symbol in self._cache and symbol in self._cache_expiry:
-            if now < self._cache_expiry[symbol]:
-                return self._cache[symbol]
-        return None
-
-    def _set_cached_data(self, symbol: str, data: dict):
-        """Cache data with expiration"""
-        self._cache[symbol] = data
-        self._cache_expiry[symbol] = datetime.now() + self.cache_duration
+        cache_config = Config.market_cache_config
+        self.cache = TieredCache(
+            DiskCache(cache_config.path, max_entries=cache_config.max_entries),
+            memory_entries=cache_config.memory_entries
+        )
+        self.cache_ttls = dict(cache_config.ttls)  # Seconds per endpoint
+        self.stale_ttls = dict(cache_config.stale_ttls)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+        api_config = Config.api_config
+        self.rate_limiter = TokenBucket(api_config.alpha_vantage_requests_per_minute, api_config.alpha_vantage_burst)
+        self.max_wait = api_config.alpha_vantage_max_wait
+        # Retries of requests that reached the API count against the same budget as first attempts
+        self.http = create_transport("alpha_vantage", read_timeout=10, rate_limiter=self.rate_limiter, max_wait=self.max_wait)
+        self.bulk_quotes_enabled = api_config.bulk_quotes_enabled
+        self.bulk_quote_function = api_config.bulk_quote_function
+        self.bulk_quote_threshold = api_config.bulk_quote_threshold
+        self.bulk_quote_batch_size = api_config.bulk_quote_batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=api_config.alpha_vantage_max_concurrency,
+            thread_name_prefix="alpha-vantage"
+        )
+
+        # Background refreshes of stale entries and hot symbols
+        self.refresh_reserve = cache_config.refresh_reserve
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=cache_config.refresh_workers,
+            thread_name_prefix="alpha-vantage-refresh"
+        )
+        self._refreshing = set()
+        self._demand = Counter()
+        self._refresh_lock = threading.Lock()
+        self.warm_symbols = cache_config.warm_symbols
+        self.warm_interval = cache_config.warm_interval
+        self.warm_decay = cache_config.warm_decay
+        # Refreshes per pass, so warming never takes more than its share of the request budget
+        self.warm_max_refreshes = max(1, int(
+            cache_config.warm_budget_share * self.rate_limiter.rate * self.warm_interval
+        ))
+        if cache_config.warm_enabled:
+            threading.Thread(target=self._warm_loop, name="alpha-vantage-warmer", daemon=True).start()
+
+        self.history_enabled = cache_config.history_enabled
+        self.history_timeout = cache_config.history_timeout
+        self.price_store = PriceStore(
+            cache_config.history_dir,
+            max_age=cache_config.history_max_age,
+            initial_outputsize=cache_config.history_outputsize
+        )
+        self._history_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alpha-vantage-history")
+
+    def _get_cached_data(self, function: str, symbol: str) -> Optional[Tuple[dict, float]]:
+        """Get a cached endpoint response and its age in seconds
+
+        Entries past their TTL but within the stale window are still
+        returned, and a background refresh is started for them.
+        """
+        entry = self.cache.get(f"alpha_vantage:{function}:{symbol}")
+        if entry is None or "fetched_at" not in entry:
+            self.cache_misses += 1
+            metrics.incr("finance_cache.miss")
+            return None
+
+        self.cache_hits += 1
+        metrics.incr("finance_cache.hit")
+        age = time.time() - entry["fetched_at"]
+        if age > self.cache_ttls[function]:
+            self.stale_hits += 1
+            metrics.incr("finance_cache.stale")
+            self._schedule_refresh(function, symbol)
+        return entry["data"], age
+
+    def _set_cached_data(self, function: str, symbol: str, data: dict):
+        """Cache an endpoint response, kept for its TTL plus the stale window"""
+        self.cache.set(
+            f"alpha_vantage:{function}:{symbol}",
+            {"data": data, "fetched_at": time.time()},
+            self.cache_ttls[function] + self.stale_ttls.get(function, 0)
+        )
 
     def get_stock_data(self, symbol: str):
         """Get stock data with caching"""
+        results, errors = self.get_many([symbol])
+        if symbol in errors:
+            raise Exception(errors[symbol])
+        return results[symbol]
+
+    async def aget_stock_data(self, symbol: str):
+        """Async variant of get_stock_data sharing the same cache"""
+        results, errors = await self.aget_many([symbol])
+        if symbol in errors:
+            raise Exception(errors[symbol])
+        return results[symbol]
+
+    def get_many(self, symbols: List[str]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Fetch several symbols concurrently
+
+        Quotes and fundamentals are cached separately. Whatever is missing is
+        requested in parallel behind the rate limiter, with quotes batched
+        into bulk requests for longer lists. Returns (results, errors) so
+        symbols that succeeded are kept when others fail.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        responses, ages, missing = self._cached_responses(symbols)
+        if missing["GLOBAL_QUOTE"] or missing["OVERVIEW"]:
+            with metrics.stage("finance.tool_io"):
+                futures = {self._executor.submit(metrics.bind(self._fetch), "OVERVIEW", symbol): (symbol, "OVERVIEW")
+                           for symbol in missing["OVERVIEW"]}
+                # Quotes missing from the bulk response fall back to one request each
+                fetched = self._bulk_quotes(missing["GLOBAL_QUOTE"])
+                futures.update({
+                    self._executor.submit(metrics.bind(self._fetch), "GLOBAL_QUOTE", symbol): (symbol, "GLOBAL_QUOTE")
+                    for symbol in missing["GLOBAL_QUOTE"] if (symbol, "GLOBAL_QUOTE") not in fetched
+                })
+                for future in as_completed(futures):
+                    try:
+                        fetched[futures[future]] = future.result()
+                    except Exception as e:
+                        fetched[futures[future]] = e
+            responses.update(fetched)
+
+        self._record_demand(symbols)
+        return self._assemble(symbols, responses, ages)
+
+    async def aget_many(self, symbols: List[str]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Async variant of get_many"""
+        symbols = list(dict.fromkeys(symbols))
+        responses, ages, missing = await asyncio.to_thread(self._cached_responses, symbols)
+        if missing["GLOBAL_QUOTE"] or missing["OVERVIEW"]:
+            with metrics.stage("finance.tool_io"):
+                overviews = [asyncio.ensure_future(self._afetch("OVERVIEW", symbol))
+                             for symbol in missing["OVERVIEW"]]
+                fetched = await self._abulk_quotes(missing["GLOBAL_QUOTE"])
+                keys = [(symbol, "OVERVIEW") for symbol in missing["OVERVIEW"]]
+                quote_keys = [(symbol, "GLOBAL_QUOTE") for symbol in missing["GLOBAL_QUOTE"]
+                              if (symbol, "GLOBAL_QUOTE") not in fetched]
+                outcomes = await asyncio.gather(
+                    *overviews,
+                    *(self._afetch("GLOBAL_QUOTE", symbol) for symbol, _ in quote_keys),
+                    return_exceptions=True
+                )
+                fetched.update(zip(keys + quote_keys, outcomes))
+            responses.update(fetched)
+
+        self._record_demand(symbols)
+        return self._assemble(symbols, responses, ages)
+
+    def submit_histories(self, symbols: List[str]) -> Future:
+        """Start loading daily histories in the background; the future yields {symbol: history}"""
+        return self._history_executor.submit(metrics.bind(self.get_histories), symbols)
+
+    def get_histories(self, symbols: List[str]) -> Dict[str, np.ndarray]:
+        """Daily OHLCV per symbol from the price store, fetching new bars where it is behind
+
+        Symbols are updated concurrently on the request executor; the history
+        executor only runs this coordinating call, so it cannot deadlock.
+        """
+        if not self.history_enabled:
+            return {}
+        symbols = list(dict.fromkeys(symbols))
+        with metrics.stage("finance.history"):
+            futures = [self._executor.submit(metrics.bind(self._update_history), symbol) for symbol in symbols]
+            histories = [future.result() for future in futures]
+        return {symbol: history for symbol, history in zip(symbols, histories) if history is not None}
+
+    async def aget_histories(self, symbols: List[str]) -> Dict[str, np.ndarray]:
+        """Async variant of get_histories; symbols are updated concurrently"""
+        if not self.history_enabled:
+            return {}
+        symbols = list(dict.fromkeys(symbols))
+        with metrics.stage("finance.history"):
+            histories = await asyncio.gather(*(self._aupdate_history(symbol) for symbol in symbols))
+        return {symbol: history for symbol, history in zip(symbols, histories) if history is not None}
+
+    def _update_history(self, symbol: str) -> Optional[np.ndarray]:
+        """Merge new daily bars if needed; stored history is used if the fetch fails"""
+        outputsize = self.price_store.needs_update(symbol)
+        if outputsize:
+            for size in dict.fromkeys([outputsize, "compact"]):
+                try:
+                    series = flights.do(
+                        ("alpha_vantage", "TIME_SERIES_DAILY", symbol, size),
+                        self._fetch_series, symbol, size
+                    )
+                    return self.price_store.merge(symbol, series)
+                except Exception as e:
+                    logging.warning(f"Daily series ({size}) for {symbol} failed: {str(e)}")
+        return self.price_store.load(symbol)
+
+    async def _aupdate_history(self, symbol: str) -> Optional[np.ndarray]:
+        """Async variant of _update_history"""
+        # Price store reads and writes are file I/O, kept off the event loop
+        outputsize = await asyncio.to_thread(self.price_store.needs_update, symbol)
+        if outputsize:
+            for size in dict.fromkeys([outputsize, "compact"]):
+                try:
+                    series = await flights.ado(
+                        ("alpha_vantage", "TIME_SERIES_DAILY", symbol, size),
+                        self._afetch_series, symbol, size
+                    )
+                    return await asyncio.to_thread(self.price_store.merge, symbol, series)
+                except Exception as e:
+                    logging.warning(f"Daily series ({size}) for {symbol} failed: {str(e)}")
+        return await asyncio.to_thread(self.price_store.load, symbol)
+
+    def _fetch_series(self, symbol: str, outputsize: str) -> dict:
+        # Indicators are optional: only spend spare budget, never wait for it
+        if not self.rate_limiter.try_acquire(self.refresh_reserve):
+            raise Exception("No spare Alpha Vantage budget for price history")
+        response = self.http.get(
+            self.base_url,
+            params=self._params("TIME_SERIES_DAILY", symbol, outputsize=outputsize),
+            timeout=30,
+            deadline=time.monotonic() + self.history_timeout
+        )
+        return self._check_rate_limit(response.json())
+
+    async def _afetch_series(self, symbol: str, outputsize: str) -> dict:
+        if not self.rate_limiter.try_acquire(self.refresh_reserve):
+            raise Exception("No spare Alpha Vantage budget for price history")
+        response = await self.http.aget(
+            self.base_url,
+            params=self._params("TIME_SERIES_DAILY", symbol, outputsize=outputsize),
+            timeout=30,
+            deadline=time.monotonic() + self.history_timeout
+        )
+        return self._check_rate_limit(response.json())
+
+    def _cached_responses(self, symbols: List[str]) -> Tuple[Dict[tuple, dict], Dict[tuple, float], Dict[str, List[str]]]:
+        """Collect cached endpoint responses, their ages, and the symbols each endpoint still needs"""
+        responses, ages = {}, {}
+        missing = {"GLOBAL_QUOTE": [], "OVERVIEW": []}
+        for symbol in symbols:
+            for function in missing:
+                cached = self._get_cached_data(function, symbol)
+                if cached is None:
+                    missing[function].append(symbol)
+                else:
+                    responses[(symbol, function)], ages[(symbol, function)] = cached
+        return responses, ages, missing
+
+    def _store(self, fetched: Dict[tuple, dict]) -> None:
+        """Cache successful endpoint responses"""
+        for (symbol, function), data in fetched.items():
+            if isinstance(data, Exception) or function not in self.cache_ttls:
+                continue
+            if function == "GLOBAL_QUOTE" and not data.get("Global Quote"):
+                continue  # Unknown symbol; let the next request try again
+            self._set_cached_data(function, symbol, data)
+
+    def _record_demand(self, symbols: List[str]) -> None:
+        """Count requests per symbol so the warmer knows which are hot"""
+        with self._refresh_lock:
+            self._demand.update(symbols)
+
+    def _schedule_refresh(self, function: str, symbol: str) -> None:
+        """Refresh one cached endpoint in the background unless already underway"""
+        with self._refresh_lock:
+            if (function, symbol) in self._refreshing:
+                return
+            self._refreshing.add((function, symbol))
+        self._refresh_executor.submit(self._refresh, function, symbol)
+
+    def _refresh(self, function: str, symbol: str) -> None:
+        """Refetch an endpoint if the rate budget has room to spare"""
         try:
-            # Check cache first
-            cached_data = self._get_cached_data(symbol)
-            if cached_data:
-                return cached_data
-
-            # Make API calls if not cached
-            quote_params = {
-                "function": "GLOBAL_QUOTE",
-                "symbol": symbol,
-                "apikey": self.api_key
-            }
-            quote_response = self.session.get(
-                self.base_url,
-                params=quote_params,
-                timeout=10
-            )
-            quote_data = quote_response.json()
-            
-            # Check for API limit message
-            if "Information" in quote_data and "API rate limit" in quote_data["Information"]:
-                raise Exception("Alpha Vantage API rate limit reached. Please try again later or upgrade to a premium plan.")
-            
-            if "Global Quote" not in quote_data:
-                raise Exception(f"Invalid quote response for {symbol}: {quote_data}")
-            
-            overview_params = {
-                "function": "OVERVIEW",
-                "symbol": symbol,
-                "apikey": self.api_key
-            }
-            overview_response = self.session.get(
-                self.base_url,
-                params=overview_params,
-                timeout=10
-            )
-            overview_data = overview_response.json()
-            
-            if "Information" in overview_data and "API rate limit" in overview_data["Information"]:
-                raise Exception("Alpha Vantage API rate limit reached. Please try again later or upgrade to a premium plan.")
-
-            result = {
-                "current_price": {
-                    "price": float(quote_data["Global Quote"]["05. price"]),
-                    "change_percent": float(quote_data["Global Quote"]["10. change percent"].rstrip('%')),
-                    "volume": int(quote_data["Global Quote"]["06. volume"]),
-                    "trading_day": quote_data["Global Quote"]["07. latest trading day"]
-                },
-                "fundamentals": {
-                    "market_cap": overview_data.get("MarketCapitalization"),
-                    "pe_ratio": overview_data.get("PERatio"),
-                    "eps": overview_data.get("EPS")
+            # Never queue behind user requests; the stale entry keeps serving until next time
+            if not self.rate_limiter.try_acquire(self.refresh_reserve):
+                return
+            flights.do(("alpha_vantage", function, symbol), self._request, function, symbol)
+            with self._refresh_lock:
+                self.refreshes += 1
+        except Exception as e:
+            logging.warning(f"Background refresh of {function} for {symbol} failed: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard((function, symbol))
+
+    def _warm_loop(self) -> None:
+        """Periodically refresh hot symbols before their entries expire"""
+        while True:
+            time.sleep(self.warm_interval)
+            try:
+                self._warm_hot_symbols()
+            except Exception as e:
+                logging.warning(f"Market data warmer failed: {str(e)}")
+
+    def _warm_hot_symbols(self) -> None:
+        with self._refresh_lock:
+            hot = [symbol for symbol, _ in self._demand.most_common(self.warm_symbols)]
+            for symbol in list(self._demand):
+                self._demand[symbol] *= self.warm_decay
+                if self._demand[symbol] < 0.05:
+                    del self._demand[symbol]
+
+        now = time.time()
+        due = []
+        for symbol in hot:
+            for function, ttl in self.cache_ttls.items():
+                entry = self.cache.peek(f"alpha_vantage:{function}:{symbol}")
+                # Refresh anything that would go stale before the next pass
+                if entry is None or "fetched_at" not in entry or now - entry["fetched_at"] >= ttl - self.warm_interval:
+                    due.append((function, symbol))
+        # Hottest symbols first; the rest wait for a later pass
+        for function, symbol in due[:self.warm_max_refreshes]:
+            self._schedule_refresh(function, symbol)
+
+    def _use_bulk(self, symbols: List[str]) -> bool:
+        """Whether quotes for these symbols should go through the bulk endpoint"""
+        return self.bulk_quotes_enabled and len(symbols) >= self.bulk_quote_threshold
+
+    def _bulk_batches(self, symbols: List[str]) -> List[List[str]]:
+        size = self.bulk_quote_batch_size
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    def _bulk_quotes(self, symbols: List[str]) -> Dict[tuple, dict]:
+        """Fetch quotes in batched requests, keyed like the per-symbol responses"""
+        responses = {}
+        if not self._use_bulk(symbols):
+            return responses
+        for batch in self._bulk_batches(symbols):
+            try:
+                quotes = self._parse_bulk_quotes(self._fetch(self.bulk_quote_function, ",".join(batch)))
+                self._store(quotes)
+                responses.update(quotes)
+            except Exception as e:
+                self._bulk_failed(e)
+                break
+        return responses
+
+    async def _abulk_quotes(self, symbols: List[str]) -> Dict[tuple, dict]:
+        """Async variant of _bulk_quotes"""
+        responses = {}
+        if not self._use_bulk(symbols):
+            return responses
+        for batch in self._bulk_batches(symbols):
+            try:
+                data = await self._afetch(self.bulk_quote_function, ",".join(batch))
+                quotes = self._parse_bulk_quotes(data)
+                await asyncio.to_thread(self._store, quotes)
+                responses.update(quotes)
+            except Exception as e:
+                self._bulk_failed(e)
+                break
+        return responses
+
+    def _parse_bulk_quotes(self, data: dict) -> Dict[tuple, dict]:
+        """Split a bulk response into GLOBAL_QUOTE-shaped responses per symbol"""
+        if "data" not in data:
+            raise Exception(data.get("message") or data.get("Information") or f"Invalid bulk quote response: {data}")
+        responses = {}
+        for item in data["data"]:
+            if not item.get("close"):
+                continue
+            responses[(item["symbol"].upper(), "GLOBAL_QUOTE")] = {
+                "Global Quote": {
+                    "05. price": item["close"],
+                    "10. change percent": str(item.get("change_percent", "0")),
+                    "06. volume": item.get("volume", "0"),
+                    "07. latest trading day": str(item.get("timestamp", ""))[:10]
                 }
             }
-            
-            # Cache the successful result
-            self._set_cached_data(symbol, result)
-            return result
-            
-        except Exception as e:
-            raise Exception(f"Error fetching stock data for {symbol}: {str(e)}")
+        metrics.incr("finance.bulk_quote", len(responses))
+        return responses
+
+    def _bulk_failed(self, error: Exception) -> None:
+        """Fall back to single quotes, and stop trying bulk if the plan lacks it"""
+        metrics.incr("finance.bulk_fallback")
+        if "premium" in str(error).lower():
+            self.bulk_quotes_enabled = False
+        logging.warning(f"Bulk quote request failed, using single quotes: {str(error)}")
+
+    def _fetch(self, function: str, symbol: str) -> dict:
+        """Request one endpoint for one symbol, joining an identical request already in flight"""
+        return flights.do(("alpha_vantage", function, symbol), self._fetch_once, function, symbol)
+
+    def _fetch_once(self, function: str, symbol: str) -> dict:
+        fresh = self._peek_fresh(function, symbol)
+        if fresh is not None:
+            return fresh
+        # Waiting for budget and retrying share max_wait, so the agent deadline is never overrun
+        deadline = time.monotonic() + self.max_wait
+        if not self.rate_limiter.acquire(self.max_wait):
+            raise Exception("Alpha Vantage request budget exhausted, try again shortly")
+        return self._request(function, symbol, deadline)
+
+    def _peek_fresh(self, function: str, symbol: str) -> Optional[dict]:
+        """A fresh cached response stored by a flight that landed after our cache check"""
+        if function not in self.cache_ttls:
+            return None
+        entry = self.cache.peek(f"alpha_vantage:{function}:{symbol}")
+        if entry is None or "fetched_at" not in entry or time.time() - entry["fetched_at"] > self.cache_ttls[function]:
+            return None
+        return entry["data"]
+
+    def _request(self, function: str, symbol: str, deadline: Optional[float] = None) -> dict:
+        """Request one endpoint without consulting the rate limiter, caching the response"""
+        response = self.http.get(self.base_url, params=self._params(function, symbol), deadline=deadline)
+        data = self._check_rate_limit(response.json())
+        # Cache before the flight lands so later callers hit the cache instead
+        self._store({(symbol, function): data})
+        return data
+
+    async def _afetch(self, function: str, symbol: str) -> dict:
+        """Async variant of _fetch"""
+        return await flights.ado(("alpha_vantage", function, symbol), self._afetch_once, function, symbol)
+
+    async def _afetch_once(self, function: str, symbol: str) -> dict:
+        fresh = await asyncio.to_thread(self._peek_fresh, function, symbol)
+        if fresh is not None:
+            return fresh
+        deadline = time.monotonic() + self.max_wait
+        if not await self.rate_limiter.aacquire(self.max_wait):
+            raise Exception("Alpha Vantage request budget exhausted, try again shortly")
+        response = await self.http.aget(self.base_url, params=self._params(function, symbol), deadline=deadline)
+        data = self._check_rate_limit(response.json())
+        await asyncio.to_thread(self._store, {(symbol, function): data})
+        return data
+
+    def _assemble(self, symbols: List[str], responses: dict, ages: Dict[tuple, float]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Build results from endpoint responses, collecting per-symbol errors"""
+        results, errors = {}, {}
+        for symbol in symbols:
+            try:
+                quote_data, overview_data = responses[(symbol, "GLOBAL_QUOTE")], responses[(symbol, "OVERVIEW")]
+                for response in (quote_data, overview_data):
+                    if isinstance(response, Exception):
+                        raise response
+                result = self._build_result(self._check_quote(symbol, quote_data), overview_data)
+                quote_age = ages.get((symbol, "GLOBAL_QUOTE"), 0.0)
+                overview_age = ages.get((symbol, "OVERVIEW"), 0.0)
+                result["stale"] = (quote_age > self.cache_ttls["GLOBAL_QUOTE"]
+                                   or overview_age > self.cache_ttls["OVERVIEW"])
+                if result["stale"]:
+                    # Whole minutes, so the prompt (and its LLM cache key) does not change every second
+                    result["data_age_minutes"] = {"quote": int(quote_age // 60), "fundamentals": int(overview_age // 60)}
+                results[symbol] = result
+            except Exception as e:
+                metrics.incr("finance.fetch_error")
+                errors[symbol] = f"Error fetching stock data for {symbol}: {str(e)}"
+        return results, errors
+
+    def _params(self, function: str, symbol: str, **extra) -> dict:
+        """Build query parameters for an Alpha Vantage function"""
+        return {
+            "function": function,
+            "symbol": symbol,
+            "apikey": self.api_key,
+            **extra
+        }
+
+    def _check_rate_limit(self, data: dict) -> dict:
+        """Raise if Alpha Vantage answered with its rate limit message"""
+        if "Information" in data and "API rate limit" in data["Information"]:
+            raise Exception("Alpha Vantage API rate limit reached. Please try again later or upgrade to a premium plan.")
+        return data
+
+    def _check_quote(self, symbol: str, quote_data: dict) -> dict:
+        """Validate a GLOBAL_QUOTE response"""
+        # Check for API limit message
+        self._check_rate_limit(quote_data)
+        
+        if "Global Quote" not in quote_data:
+            raise Exception(f"Invalid quote response for {symbol}: {quote_data}")
+        return quote_data
+
+    def _build_result(self, quote_data: dict, overview_data: dict) -> dict:
+        """Combine quote and overview responses into the agent-facing structure"""
+        return {
+            "current_price": {
+                "price": float(quote_data["Global Quote"]["05. price"]),
+                "change_percent": float(quote_data["Global Quote"]["10. change percent"].rstrip('%')),
+                "volume": int(quote_data["Global Quote"]["06. volume"]),
+                "trading_day": quote_data["Global Quote"]["07. latest trading day"]
+            },
+            "fundamentals": {
+                "market_cap": overview_data.get("MarketCapitalization"),
+                "pe_ratio": overview_data.get("PERatio"),
+                "eps": overview_data.get("EPS")
+            }
+        }
 
     def test_connection(self):
         """Test API connectivity"""
         try:
-            response = self.session.get(
+            response = self.http.get(
                 self.base_url,
                 params={"function": "TIME_SERIES_INTRADAY", "symbol": "IBM", "interval": "1min", "apikey": self.api_key},
                 timeout=5
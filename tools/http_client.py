@@ -0,0 +1,299 @@
+from typing import Optional, Tuple
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+import httpx
+from tools.rate_limit import TokenBucket
+from utils import metrics
+from utils.config import Config
+
+try:
+    import h2  # noqa: F401  HTTP/2 support is optional
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# One connection pool per process (and per event loop for async), shared by every transport
+_pool_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def _pool_limits() -> httpx.Limits:
+    config = Config.http_config
+    return httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry
+    )
+
+def shared_client() -> httpx.Client:
+    """The process-wide sync client"""
+    global _client
+    with _pool_lock:
+        if _client is None:
+            _client = httpx.Client(http2=HTTP2_AVAILABLE, limits=_pool_limits())
+        return _client
+
+def shared_async_client() -> httpx.AsyncClient:
+    """The async client of the running event loop
+
+    Clients are keyed weakly by loop, so one created for a loop that has
+    since gone away is dropped with it rather than replaced in place.
+    """
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=_pool_limits())
+            _async_clients[loop] = client
+        return client
+
+class HTTPTransport:
+    """Per-tool view of the shared keep-alive HTTP clients
+
+    Every transport sends through the same connection pools; each keeps its
+    own timeouts and counts its requests, new connections and retries so
+    pool reuse can be monitored per tool. Retryable failures are retried
+    with backoff, but never past the caller's deadline. When a rate limiter
+    is given, every retry of a request that reached the API takes a token
+    from it too, and retrying stops if none comes within max_wait.
+    """
+    def __init__(self, name: str, read_timeout: Optional[float] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_wait: Optional[float] = None):
+        self.name = name
+        self.config = Config.http_config
+        self.timeout = httpx.Timeout(
+            read_timeout or self.config.read_timeout,
+            connect=self.config.connect_timeout
+        )
+        self.rate_limiter = rate_limiter
+        self.max_wait = max_wait
+        self.client = shared_client()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.retries = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _prepare(self, kwargs: dict, trace) -> dict:
+        """Apply this transport's timeout and connection tracing to request kwargs"""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("extensions", {})["trace"] = trace
+        return kwargs
+
+    def _trace(self, event: str, info: dict) -> None:
+        """httpcore trace hook; counts connections opened rather than reused"""
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+            metrics.incr(f"http.{self.name}.connect")
+
+    async def _atrace(self, event: str, info: dict) -> None:
+        self._trace(event, info)
+
+    def _start(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _finish(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _should_retry(self, attempt: int, response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+        if attempt >= self.config.retries:
+            return False
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response.status_code in RETRY_STATUSES
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Seconds to wait before the next attempt, honouring Retry-After"""
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.config.max_backoff)
+        delay = self.config.backoff * (2 ** attempt)
+        return min(delay * (0.5 + random.random()), self.config.max_backoff)
+
+    def _retrying(self, response: Optional[httpx.Response], error: Optional[Exception]) -> None:
+        with self._lock:
+            self.retries += 1
+        metrics.incr(f"http.{self.name}.retry")
+        reason = str(error) if error is not None else f"HTTP {response.status_code}"
+        logging.info(f"Retrying {self.name} request after {reason}")
+
+    def _fits(self, deadline: Optional[float], delay: float) -> bool:
+        """Whether a retry after delay seconds still starts before the deadline"""
+        return deadline is None or time.monotonic() + delay < deadline
+
+    def _token_wait(self, error: Optional[Exception], deadline: Optional[float], delay: float) -> Optional[float]:
+        """Longest wait for a rate limit token before a retry, or None if the retry is free
+
+        Connection failures never reached the API, so their retries spend
+        no budget; other retries wait no longer than the deadline allows.
+        """
+        if self.rate_limiter is None or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return None
+        if deadline is None:
+            return self.max_wait
+        remaining = max(0.0, deadline - time.monotonic() - delay)
+        return remaining if self.max_wait is None else min(self.max_wait, remaining)
+
+    def _attempt(self, kwargs: dict, deadline: Optional[float]) -> dict:
+        """Request kwargs with the timeouts shortened so an attempt ends by the deadline"""
+        if deadline is None:
+            return kwargs
+        timeout = httpx.Timeout(kwargs["timeout"])
+        remaining = max(0.0, deadline - time.monotonic())
+        def clip(value: Optional[float]) -> float:
+            return remaining if value is None else min(value, remaining)
+        return {**kwargs, "timeout": httpx.Timeout(
+            connect=clip(timeout.connect), read=clip(timeout.read),
+            write=clip(timeout.write), pool=clip(timeout.pool)
+        )}
+
+    def request(self, method: str, url: str, deadline: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Send a request, retrying connection failures and retryable statuses
+
+        With a time.monotonic() deadline, attempts are cut off at it and no
+        retry is started that could not finish its backoff in time.
+        """
+        self._prepare(kwargs, self._trace)
+        attempt = 0
+        while True:
+            self._start()
+            response, error = None, None
+            try:
+                response = self.client.request(method, url, **self._attempt(kwargs, deadline))
+            except httpx.HTTPError as e:
+                error = e
+            finally:
+                self._finish()
+            if not self._should_retry(attempt, response, error):
+                break
+            delay = self._backoff(attempt, response)
+            if not self._fits(deadline, delay):
+                break
+            max_wait = self._token_wait(error, deadline, delay)
+            if max_wait is not None and not self.rate_limiter.acquire(max_wait):
+                break
+            self._retrying(response, error)
+            time.sleep(delay)
+            attempt += 1
+        return self._result(response, error)
+
+    async def arequest(self, method: str, url: str, deadline: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Async variant of request"""
+        self._prepare(kwargs, self._atrace)
+        client = shared_async_client()
+        attempt = 0
+        while True:
+            self._start()
+            response, error = None, None
+            try:
+                response = await client.request(method, url, **self._attempt(kwargs, deadline))
+            except httpx.HTTPError as e:
+                error = e
+            finally:
+                self._finish()
+            if not self._should_retry(attempt, response, error):
+                break
+            delay = self._backoff(attempt, response)
+            if not self._fits(deadline, delay):
+                break
+            max_wait = self._token_wait(error, deadline, delay)
+            if max_wait is not None and not await self.rate_limiter.aacquire(max_wait):
+                break
+            self._retrying(response, error)
+            await asyncio.sleep(delay)
+            attempt += 1
+        return self._result(response, error)
+
+    def _result(self, response: Optional[httpx.Response], error: Optional[Exception]) -> httpx.Response:
+        if error is not None:
+            with self._lock:
+                self.errors += 1
+            raise error
+        return response
+
+    def fetch_limited(self, url: str, max_bytes: int, deadline: float, **kwargs) -> Tuple[bytes, str]:
+        """GET a body without retries, stopping at max_bytes or the time.monotonic() deadline
+
+        Returns the (possibly truncated) body and the response content type.
+        """
+        self._prepare(kwargs, self._trace)
+        self._start()
+        try:
+            with self.client.stream("GET", url, follow_redirects=True, **kwargs) as response:
+                response.raise_for_status()
+                body = bytearray()
+                for chunk in response.iter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= max_bytes or time.monotonic() > deadline:
+                        break
+                return bytes(body[:max_bytes]), response.headers.get("Content-Type", "")
+        except httpx.HTTPError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._finish()
+
+    async def afetch_limited(self, url: str, max_bytes: int, deadline: float, **kwargs) -> Tuple[bytes, str]:
+        """Async variant of fetch_limited"""
+        self._prepare(kwargs, self._atrace)
+        self._start()
+        try:
+            async with shared_async_client().stream("GET", url, follow_redirects=True, **kwargs) as response:
+                response.raise_for_status()
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= max_bytes or time.monotonic() > deadline:
+                        break
+                return bytes(body[:max_bytes]), response.headers.get("Content-Type", "")
+        except httpx.HTTPError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._finish()
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Request, connection and retry counters"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "retries": self.retries,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "http2": HTTP2_AVAILABLE
+            }
+
+def create_transport(name: str, **kwargs):
+    """An HTTPTransport, or a FakeTransport with canned responses when fake tools are on"""
+    if Config.api_config.fake_tools:
+        from tools.fake_transport import FakeTransport
+        return FakeTransport(name, **kwargs)
+    return HTTPTransport(name, **kwargs)
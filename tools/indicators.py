@@ -0,0 +1,101 @@
+from typing import Dict, Optional
+import numpy as np
+
+TRADING_DAYS = 252
+
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average; the first window-1 points are NaN"""
+    result = np.full(close.shape, np.nan)
+    if len(close) < window:
+        return result
+    sums = np.cumsum(np.insert(close, 0, 0.0))
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Relative strength index using simple averages of gains and losses (Cutler's RSI)"""
+    result = np.full(close.shape, np.nan)
+    if len(close) <= period:
+        return result
+    change = np.diff(close)
+    avg_gain = sma(np.clip(change, 0, None), period)
+    avg_loss = sma(np.clip(-change, 0, None), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        result[1:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + rs))
+    result[1:][np.isnan(avg_gain)] = np.nan
+    return result
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    return np.diff(np.log(close))
+
+def realized_volatility(close: np.ndarray, window: int = 20) -> Optional[float]:
+    """Annualized standard deviation of the last window daily log returns"""
+    returns = log_returns(close)[-window:]
+    if len(returns) < window:
+        return None
+    return float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS))
+
+def drawdown(close: np.ndarray) -> np.ndarray:
+    """Fractional decline from the running peak at each point"""
+    return 1 - close / np.maximum.accumulate(close)
+
+def period_return(close: np.ndarray, days: int) -> Optional[float]:
+    if len(close) <= days:
+        return None
+    return float(close[-1] / close[-days - 1] - 1)
+
+def correlation(series: Dict[str, np.ndarray], window: int = 90) -> Dict[str, Dict[str, float]]:
+    """Pairwise correlation of daily log returns over the dates all symbols share"""
+    symbols = sorted(series)
+    if len(symbols) < 2:
+        return {}
+    common = series[symbols[0]]["date"]
+    for symbol in symbols[1:]:
+        common = np.intersect1d(common, series[symbol]["date"])
+    common = common[-(window + 1):]
+    if len(common) < 3:
+        return {}
+
+    returns = np.vstack([
+        log_returns(series[symbol]["close"][np.isin(series[symbol]["date"], common)])
+        for symbol in symbols
+    ])
+    matrix = np.corrcoef(returns)
+    return {
+        symbol: {other: round(float(matrix[i, j]), 3) for j, other in enumerate(symbols) if j != i}
+        for i, symbol in enumerate(symbols)
+    }
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), digits)
+
+def summarize(history: np.ndarray) -> dict:
+    """Indicator snapshot of one symbol's daily history for the finance prompt"""
+    close = np.asarray(history["close"], dtype=float)
+    year = close[-TRADING_DAYS:]
+    return {
+        "as_of": str(history["date"][-1]),
+        "days_of_history": int(len(close)),
+        "close": _round(close[-1]),
+        "sma_20": _round(sma(close, 20)[-1]),
+        "sma_50": _round(sma(close, 50)[-1]),
+        "sma_200": _round(sma(close, 200)[-1]),
+        "rsi_14": _round(rsi(close, 14)[-1], 2),
+        "volatility_20d_annualized": _round(realized_volatility(close, 20)),
+        "return_1m": _round(period_return(close, 21)),
+        "return_3m": _round(period_return(close, 63)),
+        "return_1y": _round(period_return(close, TRADING_DAYS)),
+        "max_drawdown_1y": _round(float(drawdown(year).max())),
+        "current_drawdown": _round(float(drawdown(year)[-1]))
+    }
+
+def compute_indicators(histories: Dict[str, np.ndarray]) -> dict:
+    """Per-symbol indicator summaries plus cross-symbol return correlation"""
+    usable = {symbol: history for symbol, history in histories.items() if history is not None and len(history) > 1}
+    result = {"symbols": {symbol: summarize(history) for symbol, history in usable.items()}}
+    if len(usable) > 1:
+        result["return_correlation_90d"] = correlation(usable)
+    return result
@@ -1,50 +1,86 @@
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.callbacks.base import BaseCallbackHandler
-from typing import List, Any
+from concurrent.futures import Future, TimeoutError
+from typing import List, Any, Optional
+import faiss
+import logging
 import sys
+import threading
+import time
+from utils import metrics
 from utils.config import Config
 
 class StreamingHandler(BaseCallbackHandler):
     def __init__(self):
-        self.text = ""
+        self._chunks = []
+        
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
         
     def on_llm_new_token(self, token: str, **kwargs) -> None:
         sys.stdout.write(token)
         sys.stdout.flush()
-        self.text += token
+        self._chunks.append(token)
+
+def detect_device() -> str:
+    """Pick the fastest available torch device: cuda, then mps, then cpu"""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
 
 class RAGSystem:
     def __init__(self, 
                  index_path: str = "./data/indexes",
                  embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2',
-                 device: str = 'mps'):
+                 device: Optional[str] = None):
         # Disable logging for the transformers and FAISS
-        import logging
         logging.getLogger('sentence_transformers').setLevel(logging.WARNING)
         logging.getLogger('faiss').setLevel(logging.WARNING)
         
         self.index_path = index_path
         self.embedding_model = embedding_model
+        self.device = device if device and device != "auto" else detect_device()
         self.embeddings = HuggingFaceEmbeddings(
             model_name=self.embedding_model,
-            model_kwargs={'device': device}
+            model_kwargs={'device': self.device}
         )
         self.vector_store = FAISS.load_local(
             self.index_path, 
             self.embeddings,
             allow_dangerous_deserialization=True
         )
+        self._ivf = faiss.try_extract_index_ivf(self.vector_store.index)
+        self._hnsw = getattr(faiss.downcast_index(self.vector_store.index), "hnsw", None)
+        # MMR reconstructs candidate vectors, which IVF indexes only support with a direct map
+        if self._ivf is not None and self._ivf.direct_map.type == faiss.DirectMap.NoMap:
+            self._ivf.make_direct_map()
+        self._params_lock = threading.Lock()
         
-    def get_context(self, query: str, k: int = 12) -> str:
-        """Retrieve relevant context for a query"""
+    def get_context(self, query: str, k: int = 12, fetch_k: int = 20, lambda_mult: float = 0.5,
+                    nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> str:
+        """Retrieve relevant context for a query
+
+        nprobe (IVF indexes) and ef_search (HNSW indexes) trade recall for
+        latency; they are ignored for index types they do not apply to.
+        Both are index-wide settings, so concurrent queries share them.
+        """
         try:
+            self._set_search_params(nprobe, ef_search, fetch_k)
             retriever = self.vector_store.as_retriever(
                 search_type="mmr",
                 search_kwargs={
                     "k": k,
-                    "fetch_k": 20,
-                    "lambda_mult": 0.5
+                    "fetch_k": fetch_k,
+                    "lambda_mult": lambda_mult
                 }
             )
             docs = retriever.invoke(query)
@@ -52,26 +88,96 @@ class RAGSystem:
         except Exception as e:
             raise Exception(f"Error retrieving context: {str(e)}")
 
+    def _set_search_params(self, nprobe: Optional[int], ef_search: Optional[int], fetch_k: int) -> None:
+        with self._params_lock:
+            if self._ivf is not None and nprobe and self._ivf.nprobe != nprobe:
+                self._ivf.nprobe = nprobe
+            if self._hnsw is not None and ef_search:
+                # The graph search must keep at least fetch_k candidates
+                ef_search = max(ef_search, fetch_k)
+                if self._hnsw.efSearch != ef_search:
+                    self._hnsw.efSearch = ef_search
+
     def _format_context(self, docs: List[Any]) -> str:
         """Format retrieved documents into a string"""
         context_parts = []
         for i, doc in enumerate(docs, 1):
             metadata = doc.metadata
+            source = metadata.get('source', metadata.get('source_file', 'Unknown'))
+            if 'page' in metadata:
+                pages = metadata['page'] if metadata.get('page_end', metadata['page']) == metadata['page'] else f"{metadata['page']}-{metadata['page_end']}"
+                source = f"{source}, page {pages}"
             context_parts.append(
                 f"Document {i}:\n"
-                f"Source: {metadata.get('source', 'Unknown')}\n"
+                f"Source: {source}\n"
                 f"Content: {doc.page_content}\n"
             )
         return "\n".join(context_parts)
 
+_rag_load: Optional[Future] = None
+_rag_lock = threading.Lock()
+_rag_failed_at = 0.0
+
+def _load_rag_system(future: Future) -> None:
+    global _rag_failed_at
+    start = time.monotonic()
+    try:
+        rag_system = RAGSystem(
+            index_path=Config.path_config.index_dir,
+            embedding_model=Config.rag_config.embedding_model,
+            device=Config.rag_config.device
+        )
+        logging.info(f"RAG index loaded from {rag_system.index_path} on {rag_system.device} in {time.monotonic() - start:.1f}s")
+        future.set_result(rag_system)
+    except BaseException as e:
+        logging.warning(f"Failed to load RAG index: {str(e)}")
+        _rag_failed_at = time.monotonic()
+        future.set_exception(e)
+
+def warm_rag_system() -> Future:
+    """Start loading the process-wide RAGSystem in the background
+
+    Returns the load future; calling again while a load is in flight or
+    after it succeeded returns the same future. A failed load is retried
+    once load_retry_after has passed, so a rebuilt index is picked up
+    without a restart but queries in between fail fast on the cached error.
+    """
+    global _rag_load
+    with _rag_lock:
+        failed = _rag_load is not None and _rag_load.done() and _rag_load.exception() is not None
+        if _rag_load is None or (failed and time.monotonic() - _rag_failed_at >= Config.rag_config.load_retry_after):
+            _rag_load = Future()
+            threading.Thread(target=_load_rag_system, args=(_rag_load,), name="rag-warmup", daemon=True).start()
+        return _rag_load
+
+def get_rag_system(timeout: Optional[float] = None) -> RAGSystem:
+    """The shared RAGSystem, waiting for a warm-up that is still running"""
+    future = warm_rag_system()
+    if not future.done():
+        metrics.incr("pdf.index_wait")
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        raise Exception(f"PDF index still loading after {timeout:g}s")
+
 class PDFTool:
     """Main interface for PDF processing and RAG capabilities"""
     def __init__(self):
-        self.config = Config.path_config
-        self.rag_system = RAGSystem(
-            index_path=self.config.index_dir
-        )
+        self.config = Config.rag_config
+        if self.config.warm_on_startup:
+            warm_rag_system()
+        
+    @property
+    def rag_system(self) -> RAGSystem:
+        return get_rag_system(self.config.load_timeout)
         
     def query_documents(self, query: str) -> str:
         """Query the processed documents"""
-        return self.rag_system.get_context(query)
\ No newline at end of file
+        return self.rag_system.get_context(
+            query,
+            k=self.config.k,
+            fetch_k=self.config.fetch_k,
+            lambda_mult=self.config.lambda_mult,
+            nprobe=self.config.nprobe,
+            ef_search=self.config.ef_search
+        )
\ No newline at end of file
@@ -0,0 +1,108 @@
+from datetime import date
+from typing import Dict, Optional
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+PRICE_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8")
+])
+
+# The compact daily series covers the last 100 trading days
+COMPACT_DAYS = 100
+
+class PriceStore:
+    """Daily OHLCV history per symbol, one memory-mapped .npy file each
+
+    Files are replaced atomically when new bars arrive, so readers holding
+    a memory map keep a consistent (if slightly older) view.
+    """
+    def __init__(self, root: str, max_age: float = 6 * 3600, initial_outputsize: str = "compact"):
+        self.root = root
+        self.max_age = max_age  # Seconds before a file is checked for new bars
+        self.initial_outputsize = initial_outputsize
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol.upper()}.npy")
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def load(self, symbol: str) -> Optional[np.ndarray]:
+        """Memory-map a symbol's history, oldest bar first"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            return np.load(path)  # Empty arrays cannot be memory-mapped
+
+    def needs_update(self, symbol: str) -> Optional[str]:
+        """The series size to request for a symbol, or None if it is current"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return self.initial_outputsize
+        if time.time() - os.path.getmtime(path) < self.max_age:
+            return None
+        history = self.load(symbol)
+        if len(history) == 0:
+            return self.initial_outputsize
+        # A compact response cannot bridge a gap longer than it covers
+        gap = np.busday_count(history["date"][-1], np.datetime64(date.today()))
+        return "compact" if gap < COMPACT_DAYS else "full"
+
+    def merge(self, symbol: str, series: dict) -> np.ndarray:
+        """Append bars from a TIME_SERIES_DAILY response that are newer than the stored ones
+
+        A response that starts after the last stored bar would leave a hole
+        in the series, so the stored history is replaced by it instead.
+        """
+        bars = self._parse(series)
+        with self._lock(symbol):
+            existing = self.load(symbol)
+            if existing is not None and len(existing) and len(bars) and bars["date"][0] > existing["date"][-1]:
+                logging.warning(f"Daily series for {symbol} does not reach back to {existing['date'][-1]}, replacing stored history")
+                history = bars
+            elif existing is not None and len(existing):
+                bars = bars[bars["date"] > existing["date"][-1]]
+                history = np.concatenate([np.asarray(existing), bars])
+            else:
+                history = bars
+            self._write(symbol, history)
+        return self.load(symbol)
+
+    def _parse(self, series: dict) -> np.ndarray:
+        key = next((k for k in series if k.startswith("Time Series")), None)
+        if key is None:
+            raise Exception(f"Invalid daily series response: {str(series)[:200]}")
+        rows = sorted(series[key].items())
+        bars = np.empty(len(rows), dtype=PRICE_DTYPE)
+        for i, (day, values) in enumerate(rows):
+            bars[i] = (
+                np.datetime64(day, "D"),
+                float(values["1. open"]),
+                float(values["2. high"]),
+                float(values["3. low"]),
+                float(values["4. close"]),
+                float(values["5. volume"])
+            )
+        return bars
+
+    def _write(self, symbol: str, history: np.ndarray) -> None:
+        path = self._path(symbol)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, history)
+        os.replace(temp_path, path)  # Also refreshes the mtime checked by needs_update
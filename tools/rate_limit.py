@@ -0,0 +1,56 @@
+from typing import Optional
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket for pacing requests to a rate-limited API"""
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_minute)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, max_wait: Optional[float]) -> Optional[float]:
+        """Take a token, returning how long to wait for it, or None if too long"""
+        with self._lock:
+            self._refill()
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            # Going negative queues this caller behind earlier reservations
+            self._tokens -= 1
+            return wait
+
+    def try_acquire(self, reserve: float = 0.0) -> bool:
+        """Take a token only if one is available right now, leaving reserve tokens for others"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1 + reserve:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Block until a token is available; False if that would exceed max_wait"""
+        wait = self._reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, max_wait: Optional[float] = None) -> bool:
+        """Async variant of acquire"""
+        wait = self._reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
@@ -0,0 +1,228 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import csv
+import logging
+import os
+import re
+import threading
+from utils.config import Config
+
+# English words that are also tickers or company names; matches on these need more evidence
+COMMON_WORDS = frozenset("""
+a about after all also am an and any are as at back be best big box but buy by can car cash ceo cfo
+cost day deal do does dog eat edit else eps even ever far fast fat few fit fly for fun gap get go good
+got grow has have he hear help her here high him his hold hot how i if in into is it its job just key
+kind life like live love low main make man many may me more most much my new next nice no not now of
+off oh old on one open or our out over own pay pe peak play plus post price pump rare real rent ride
+run safe say see sell she shop sign so some stay step sun sure table take team tell than that the
+their them then there they this tip to today top true try two up us usa use very view wait want was
+way we well were what when where which who why will win with work yes yet you your
+apple target visa block snap meta shell gap ford square oracle ball corning crown dollar
+general progressive southern equity realty prudential discover match zoom unity coin
+""".split())
+
+# Suffixes dropped from listed company names to derive the names people actually type
+NAME_SUFFIXES = re.compile(
+    r"(,?\s+(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|lp|nv|sa|ag|se|"
+    r"holdings?|group|class [a-z]|common stock|ordinary shares|new|the)\.?)+$"
+)
+
+# Well-known names that cannot be derived from listing names
+BUILTIN_ALIASES = {
+    "google": "GOOGL",
+    "facebook": "META",
+    "meta": "META",
+    "coca cola": "KO",
+    "coca-cola": "KO",
+    "jpmorgan": "JPM",
+    "jp morgan": "JPM",
+    "microsoft": "MSFT",
+    "alphabet": "GOOGL",
+    "amazon": "AMZN",
+    "tesla": "TSLA",
+    "nvidia": "NVDA",
+    "netflix": "NFLX",
+    "disney": "DIS",
+    "walmart": "WMT",
+    "exxon": "XOM",
+    "mcdonalds": "MCD",
+    "mcdonald's": "MCD"
+}
+
+TICKER_PATTERN = re.compile(r"(\$?)\b([A-Z]{1,5})\b")
+
+def normalize_name(name: str) -> str:
+    """Lowercase a company name and strip legal suffixes"""
+    name = re.sub(r"\(.*?\)|\s+-\s+", " ", name.lower())
+    name = re.sub(r"\s+", " ", name).strip()
+    name = NAME_SUFFIXES.sub("", name).strip(" ,.")
+    return name
+
+class _Automaton:
+    """Aho-Corasick automaton for matching many names in one pass"""
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append(pattern)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, pattern) occurrences in text"""
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                matches.append((index - len(pattern) + 1, index + 1, pattern))
+        return matches
+
+class SymbolIndex:
+    """Offline ticker and company-name lookup built from a listing file
+
+    The listing is Alpha Vantage's LISTING_STATUS CSV (see
+    scripts/download_listings.py). An optional aliases CSV with alias,symbol
+    columns adds names that cannot be derived from the listing.
+    """
+    def __init__(self, listings_path: str, aliases_path: Optional[str] = None):
+        self.tickers: Set[str] = set()
+        self.names: Dict[str, Set[str]] = {}
+        self.curated: Set[str] = set()
+        self._load_listings(listings_path)
+        self._load_aliases(aliases_path)
+        self._automaton = _Automaton(self.names)
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a listing was available; without one tickers cannot be confirmed"""
+        return bool(self.tickers)
+
+    def _load_listings(self, path: str) -> None:
+        if not os.path.exists(path):
+            logging.warning(f"Listing file {path} not found; run scripts/download_listings.py")
+            return
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                symbol = row.get("symbol", "").strip().upper()
+                if not symbol or row.get("status", "Active") != "Active":
+                    continue
+                self.tickers.add(symbol)
+                name = normalize_name(row.get("name", ""))
+                if len(name) >= 3:
+                    self.names.setdefault(name, set()).add(symbol)
+
+    def _load_aliases(self, path: Optional[str]) -> None:
+        for alias, symbol in BUILTIN_ALIASES.items():
+            self._add_alias(alias, symbol)
+        if not path or not os.path.exists(path):
+            return
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self._add_alias(row["alias"], row["symbol"])
+
+    def _add_alias(self, alias: str, symbol: str) -> None:
+        # Curated aliases override anything derived from the listing
+        alias = alias.lower().strip()
+        self.names[alias] = {symbol.strip().upper()}
+        self.curated.add(alias)
+
+    def _primary_symbol(self, symbols: Set[str]) -> Optional[str]:
+        """Pick one symbol for a name, or None if several plain symbols compete"""
+        plain = sorted(s for s in symbols if s.isalpha())
+        if len(plain) == 1:
+            return plain[0]
+        return None
+
+    def extract(self, text: str) -> Tuple[Set[str], Set[str]]:
+        """Find symbols in text, split into (confident, ambiguous)
+
+        Tickers must appear in capitals. A ticker that is also an English
+        word ("ALL", "NOW") is only confident with a $ prefix; otherwise it
+        is ambiguous in mixed-case text and ignored in all-caps text. Company
+        names match case-insensitively, except that one-word names taken
+        from the listing, and curated names that are common words ("Target",
+        "Apple"), need a capital letter to be confident.
+        """
+        confident: Set[str] = set()
+        ambiguous: Set[str] = set()
+        letters = [c for c in text if c.isalpha()]
+        shouting = bool(letters) and sum(c.isupper() for c in letters) / len(letters) > 0.8
+
+        for dollar, token in TICKER_PATTERN.findall(text):
+            if self.loaded and token not in self.tickers:
+                continue
+            if dollar:
+                confident.add(token)
+            elif token.lower() in COMMON_WORDS or len(token) == 1:
+                if not shouting:
+                    ambiguous.add(token)
+            elif self.loaded:
+                confident.add(token)
+            else:
+                ambiguous.add(token)
+
+        for start, end, name in self._matches(text.lower()):
+            symbol = self._primary_symbol(self.names[name])
+            if symbol is None:
+                ambiguous.update(s for s in self.names[name] if s.isalpha())
+            elif not text[start].isupper() and (name in COMMON_WORDS or (" " not in name and name not in self.curated)):
+                ambiguous.add(symbol)
+            else:
+                confident.add(symbol)
+
+        return confident, ambiguous - confident
+
+    def _matches(self, lowered: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest name matches that fall on word boundaries"""
+        candidates = [
+            (start, end, name) for start, end, name in self._automaton.find(lowered)
+            if (start == 0 or not lowered[start - 1].isalnum())
+            and (end == len(lowered) or not lowered[end].isalnum())
+        ]
+        candidates.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected = []
+        covered = 0
+        for start, end, name in candidates:
+            if start >= covered:
+                selected.append((start, end, name))
+                covered = end
+        return selected
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+def get_symbol_index() -> SymbolIndex:
+    """Build the process-wide index on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex(Config.path_config.listings_path, Config.path_config.aliases_path)
+        return _index
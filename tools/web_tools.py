@@ -1,18 +1,49 @@
-from typing import List, Dict
-import requests
+from typing import List, Dict, Optional
+from tools.http_client import create_transport
+from utils import metrics
+from utils.cache import DiskCache, TieredCache
 from utils.config import Config
-from datetime import datetime, timedelta
+from utils.singleflight import flights
+from datetime import datetime
+import asyncio
+import re
+
+# Words that do not change what a search returns
+SEARCH_STOP_WORDS = {
+    "a", "an", "the", "and", "of", "in", "on", "for", "to", "is", "are", "was",
+    "what", "whats", "s", "about", "me", "please", "show", "tell", "give", "any"
+}
+
+def search_cache_key(query: str, num_results: int) -> str:
+    """Normalize a query so near-duplicates share a cache entry
+
+    Case, whitespace, punctuation and stop words are ignored, so "NVDA news"
+    and "nvda news?" map to the same key. Word order is kept, since it can
+    change the meaning ("apple buys openai stake" is not "openai buys apple
+    stake").
+    """
+    words = re.findall(r"[a-z0-9$]+(?:[.'&-][a-z0-9]+)*", query.lower())
+    terms = [w for w in words if w not in SEARCH_STOP_WORDS] or words
+    return f"serper:{num_results}:{' '.join(terms)}"
 
 class SerperTool:
     def __init__(self):
         self.api_key = Config.api_config.serper_api_key
-        if not self.api_key:
+        if not self.api_key and not Config.api_config.fake_tools:
             raise ValueError("SERPER_API_KEY not found in environment variables")
             
         self.base_url = "https://google.serper.dev/search"
-        self._cache = {}
-        self._cache_expiry = {}
-        self.cache_duration = timedelta(minutes=30)
+        cache_config = Config.search_cache_config
+        disk = DiskCache(cache_config.path, max_entries=cache_config.max_entries) if cache_config.persist else None
+        self.cache = TieredCache(
+            disk,
+            memory_entries=cache_config.memory_entries,
+            max_memory_bytes=cache_config.max_memory_bytes
+        )
+        self.cache_ttl = cache_config.ttl  # Seconds
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.http = create_transport("serper")
         
         # Trusted financial domains
         self.trusted_domains = [
@@ -30,63 +61,117 @@ class SerperTool:
         
     def search(self, query: str, num_results: int = 5) -> List[Dict]:
         """Perform search with caching and result processing"""
-        cache_key = f"{query}_{num_results}"
+        cache_key = search_cache_key(query, num_results)
         
         # Check cache
-        if self._is_cache_valid(cache_key):
-            return self._cache[cache_key]
+        cached_results = self._get_cached_results(cache_key)
+        if cached_results is not None:
+            return cached_results
+        
+        try:
+            # Identical searches already in flight share one upstream request
+            return flights.do(("serper", cache_key), self._fetch_results, cache_key, query, num_results)
             
-        headers = {
+        except Exception as e:
+            raise Exception(f"Error fetching search results: {str(e)}")
+
+    async def asearch(self, query: str, num_results: int = 5) -> List[Dict]:
+        """Async variant of search sharing the same cache"""
+        cache_key = search_cache_key(query, num_results)
+        
+        cached_results = await asyncio.to_thread(self._get_cached_results, cache_key)
+        if cached_results is not None:
+            return cached_results
+        
+        try:
+            return await flights.ado(("serper", cache_key), self._afetch_results, cache_key, query, num_results)
+            
+        except Exception as e:
+            raise Exception(f"Error fetching search results: {str(e)}")
+
+    def _fetch_results(self, cache_key: str, query: str, num_results: int) -> List[Dict]:
+        """POST the search to Serper and cache the filtered results"""
+        cached_results = self.cache.peek(cache_key)
+        if cached_results is not None:
+            return cached_results  # Stored by a flight that landed after our cache check
+        with metrics.stage("web.tool_io"):
+            response = self.http.post(
+                self.base_url, 
+                headers=self._headers(),
+                json=self._payload(query, num_results)
+            )
+        response.raise_for_status()
+        return self._store_results(cache_key, response.json(), num_results)
+
+    async def _afetch_results(self, cache_key: str, query: str, num_results: int) -> List[Dict]:
+        """Async variant of _fetch_results"""
+        cached_results = await asyncio.to_thread(self.cache.peek, cache_key)
+        if cached_results is not None:
+            return cached_results
+        with metrics.stage("web.tool_io"):
+            response = await self.http.apost(
+                self.base_url,
+                headers=self._headers(),
+                json=self._payload(query, num_results)
+            )
+        response.raise_for_status()
+        return await asyncio.to_thread(self._store_results, cache_key, response.json(), num_results)
+
+    def _headers(self) -> Dict:
+        """Request headers for the Serper API"""
+        return {
             'X-API-KEY': self.api_key,
             'Content-Type': 'application/json'
         }
-        
-        payload = {
+
+    def _payload(self, query: str, num_results: int) -> Dict:
+        """Request body for the Serper API"""
+        return {
             'q': query,
             'num': num_results * 2  # Request extra to filter
         }
+
+    def _store_results(self, cache_key: str, data: Dict, num_results: int) -> List[Dict]:
+        """Filter raw results to trusted domains and cache them"""
+        results = data.get('organic', [])
         
-        try:
-            response = requests.post(
-                self.base_url, 
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            results = response.json().get('organic', [])
-            
-            # Process and filter results
-            processed_results = []
-            for result in results:
-                # Check domain trustworthiness
-                if not any(domain in result['link'].lower() 
-                          for domain in self.trusted_domains):
-                    continue
-                    
-                processed_results.append({
-                    'title': result['title'],
-                    'snippet': result['snippet'],
-                    'link': result['link'],
-                    'date': self._extract_date(result)
-                })
+        # Process and filter results
+        processed_results = []
+        for result in results:
+            # Check domain trustworthiness
+            if not any(domain in result['link'].lower() 
+                      for domain in self.trusted_domains):
+                continue
                 
-                if len(processed_results) >= num_results:
-                    break
-            
-            # Cache results
-            self._cache[cache_key] = processed_results
-            self._cache_expiry[cache_key] = datetime.now() + self.cache_duration
+            processed_results.append({
+                'title': result['title'],
+                'snippet': result['snippet'],
+                'link': result['link'],
+                'date': self._extract_date(result)
+            })
             
-            return processed_results
-            
-        except Exception as e:
-            raise Exception(f"Error fetching search results: {str(e)}")
+            if len(processed_results) >= num_results:
+                break
+        
+        # Cache results
+        self.cache.set(cache_key, processed_results, self.cache_ttl)
+        
+        return processed_results
             
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached data is still valid"""
-        if key in self._cache and key in self._cache_expiry:
-            return datetime.now() < self._cache_expiry[key]
-        return False
+    def _get_cached_results(self, cache_key: str) -> Optional[List[Dict]]:
+        """Get cached results if available and not expired"""
+        cached_results = self.cache.get(cache_key)
+        if cached_results is not None:
+            self.cache_hits += 1
+            metrics.incr("search_cache.hit")
+            return cached_results
+        self.cache_misses += 1
+        metrics.incr("search_cache.miss")
+        return None
+        
+    def cache_stats(self) -> Dict:
+        """Hit ratio and memory use of the search cache"""
+        return self.cache.stats()
         
     def _extract_date(self, result: Dict) -> str:
         """Extract and format date from result"""
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Access times recorded before they are written back in one statement
+TOUCH_BATCH = 256
+
+class DiskCache:
+    """SQLite-backed key/value store with per-entry TTLs and LRU eviction
+
+    Values are stored as JSON. The database runs in WAL mode so several
+    worker processes can share one file. Reads only SELECT; their access
+    times are buffered and written back in batches, so a cache hit does not
+    cost a write and commit.
+    """
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touched: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value if present and not expired"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """Get (value, expires_at) if present and not expired"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touches()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after ttl seconds if given"""
+        now = time.time()
+        payload = json.dumps(value)
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, expires_at, now, len(payload))
+            )
+            self._writes += 1
+            # Eviction scans the table, so only run it every so often
+            if self._writes % 100 == 0:
+                self._evict(now)
+
+    def delete(self, key: str) -> None:
+        """Remove a value"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _flush_touches(self) -> None:
+        """Write buffered access times; callers hold the lock inside a transaction"""
+        self._conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until within bounds"""
+        self._flush_touches()
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        if self.max_bytes is not None and total_bytes > self.max_bytes:
+            excess = total_bytes - self.max_bytes
+            rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+            stale = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                stale.append((key,))
+                excess -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+class TieredCache:
+    """Bounded in-memory LRU in front of an optional DiskCache
+
+    Reads are served from memory when possible and fall through to disk,
+    which survives restarts and is shared with other processes. Without a
+    disk tier it is a plain bounded LRU with TTLs.
+    """
+    def __init__(self, disk: Optional[DiskCache], memory_entries: int = 1024, max_memory_bytes: Optional[int] = None):
+        self.disk = disk
+        self.memory_entries = memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        # key -> (value, expires_at, size of the JSON payload)
+        self._memory: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value from memory, then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                self._forget(key)
+
+        entry = self.disk.get_entry(key) if self.disk is not None else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry[0], entry[1], len(json.dumps(entry[0])))
+        return entry[0]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Get a value without counting it or changing recency"""
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None and (entry[1] is None or entry[1] > time.time()):
+            return entry[0]
+        entry = self.disk.get_entry(key) if self.disk is not None else None
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value in both tiers"""
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+        # Round-trip through JSON so memory hits return what disk hits would
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, json.loads(payload), time.time() + ttl if ttl is not None else None, len(payload))
+
+    def delete(self, key: str) -> None:
+        """Remove a value from both tiers"""
+        with self._lock:
+            self._forget(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and memory occupancy"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else None,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes
+            }
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float], size: int) -> None:
+        self._forget(key)
+        self._memory[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        while self._memory and (
+            len(self._memory) > self.memory_entries
+            or (self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes)
+        ):
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _forget(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
@@ -3,10 +3,25 @@ import sys
 
 class StreamingHandler(BaseCallbackHandler):
     def __init__(self):
-        self.text = ""
+        self._chunks = []
+        
+    @property
+    def text(self) -> str:
+        """Everything streamed so far"""
+        return "".join(self._chunks)
         
     def on_llm_new_token(self, token: str, **kwargs) -> None:
         """Stream tokens to stdout as they're generated"""
         sys.stdout.write(token)
         sys.stdout.flush()
-        self.text += token 
\ No newline at end of file
+        self._chunks.append(token)
+
+class QueueHandler(BaseCallbackHandler):
+    """Forward tokens from worker threads to an asyncio queue"""
+    def __init__(self, queue, loop):
+        self.queue = queue
+        self.loop = loop
+        
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        """Hand each token to the event loop that owns the queue"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, token)
\ No newline at end of file
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 import os
 from dotenv import load_dotenv
 
@@ -17,19 +18,179 @@ class ModelConfig:
 
     local_display_name: str = "Local (Ollama LLaMA 3.2)"
     groq_display_name: str = "Groq (LLaMA 3.2 90B)"
+    fake_display_name: str = "Fake (offline benchmarking)"
+
+    # Simulated generation for the fake provider
+    fake_time_to_first_token: float = float(os.getenv("FAKE_LLM_TTFT", "0.3"))
+    fake_tokens_per_second: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "40"))
+    fake_jitter: float = float(os.getenv("FAKE_LLM_JITTER", "0.1"))
+    fake_response_tokens: int = 200
+    fake_seed: int = 0
 
 @dataclass
 class APIConfig:
     serper_api_key: str = os.getenv("SERPER_API_KEY")
     alpha_vantage_key: str = os.getenv("ALPHA_VANTAGE_API_KEY")
+    # Size these to the Alpha Vantage plan; the free tier allows 5 requests per minute
+    alpha_vantage_requests_per_minute: float = float(os.getenv("ALPHA_VANTAGE_REQUESTS_PER_MINUTE", "5"))
+    alpha_vantage_burst: Optional[int] = None  # Defaults to one minute's worth of requests
+    alpha_vantage_max_concurrency: int = 8
+    alpha_vantage_max_wait: float = 20.0  # Give up on a request, retries included, rather than run past the agent deadline
+    # Batch quotes for longer symbol lists; disabled automatically if the plan lacks the endpoint
+    bulk_quotes_enabled: bool = os.getenv("ALPHA_VANTAGE_BULK_QUOTES", "true").lower() == "true"
+    bulk_quote_function: str = "REALTIME_BULK_QUOTES"
+    bulk_quote_threshold: int = 3
+    bulk_quote_batch_size: int = 100
+    # Canned local responses instead of the real APIs; switched on with the fake provider
+    fake_tools: bool = False
+    fake_tool_latency: float = float(os.getenv("FAKE_TOOL_LATENCY", "0.2"))  # Mean seconds per request
 
 @dataclass
 class PathConfig:
     documents_dir: str = "./data/documents"
     processed_dir: str = "./data/processed"
     index_dir: str = "./data/indexes"
+    listings_path: str = "./data/listings/listing_status.csv"
+    aliases_path: str = "./data/listings/aliases.csv"
+
+@dataclass
+class ExecutionConfig:
+    parallel_agents: bool = True
+    max_workers: int = 8
+    agent_timeout: float = 60.0  # Seconds before synthesis proceeds without an agent
+    agent_timeouts: Dict[str, float] = field(default_factory=lambda: {
+        "pdf": 60.0,
+        "finance": 30.0,
+        "web": 45.0
+    })
+    prefetch_enabled: bool = True  # Start tool fetches while the LLM planner runs
+    prefetch_workers: int = 4
+    prefetch_max_age: float = 120.0  # Seconds before an unclaimed prefetch is dropped
+
+@dataclass
+class RoutingConfig:
+    enabled: bool = True
+    min_confidence: float = 0.3  # Below this the LLM planner decides
+    select_threshold: float = 0.5
+    history_match: float = 0.9  # Similarity at which a logged routing is reused
+    history_size: int = 5000
+    cache_size: int = 1024
+    log_path: str = "./data/routing/routing_log.jsonl"
+
+@dataclass
+class ServerConfig:
+    host: str = os.getenv("EXPERT_AGENT_HOST", "0.0.0.0")
+    port: int = int(os.getenv("EXPERT_AGENT_PORT", "8080"))
+    max_concurrent_requests: int = 64  # Queries in flight on the event loop
+
+@dataclass
+class LLMCacheConfig:
+    enabled: bool = True
+    path: str = "./data/cache/llm_cache.sqlite"
+    max_entries: int = 20000
+    max_bytes: int = 200 * 1024 * 1024
+    # Seconds to keep a response per prompt type; types not listed are never cached
+    ttls: Dict[str, float] = field(default_factory=lambda: {
+        "routing": 7 * 24 * 3600,
+        "symbols": 30 * 24 * 3600,
+        "finance": 15 * 60,
+        "web": 30 * 60,
+        "pdf": 24 * 3600,
+        "synthesis": 15 * 60
+    })
+
+@dataclass
+class MarketDataCacheConfig:
+    path: str = "./data/cache/market_data.sqlite"
+    memory_entries: int = 1024
+    max_entries: int = 50000
+    # Seconds to keep each Alpha Vantage endpoint; fundamentals move far slower than prices
+    ttls: Dict[str, float] = field(default_factory=lambda: {
+        "GLOBAL_QUOTE": 60,
+        "OVERVIEW": 24 * 3600
+    })
+    # Extra seconds past the TTL that data is still served, flagged stale, while it refreshes
+    stale_ttls: Dict[str, float] = field(default_factory=lambda: {
+        "GLOBAL_QUOTE": 15 * 60,
+        "OVERVIEW": 7 * 24 * 3600
+    })
+    refresh_workers: int = 2
+    refresh_reserve: float = 1.0  # Rate limit tokens background refreshes leave for user requests
+    # Keep the most requested symbols refreshed ahead of expiry
+    warm_enabled: bool = True
+    warm_symbols: int = 20
+    warm_interval: float = 15.0
+    warm_decay: float = 0.9  # Demand multiplier per interval, so interest fades over a few minutes
+    warm_budget_share: float = 0.5  # Share of the requests accrued per interval the warmer may spend (at least one)
+    # Daily price history for trend and volatility indicators
+    history_enabled: bool = True
+    history_dir: str = "./data/prices"
+    history_max_age: float = 6 * 3600  # Seconds before a symbol is checked for new daily bars
+    history_outputsize: str = "compact"  # "full" backfills decades but needs a premium plan
+    history_timeout: float = 10.0  # Seconds a query waits for histories before answering without indicators
+
+@dataclass
+class SearchCacheConfig:
+    ttl: float = 30 * 60
+    memory_entries: int = 2048
+    max_memory_bytes: int = 32 * 1024 * 1024
+    persist: bool = True  # Keep results on disk across restarts and worker processes
+    path: str = "./data/cache/search_cache.sqlite"
+    max_entries: int = 20000
+
+@dataclass
+class RAGConfig:
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    device: str = os.getenv("RAG_DEVICE", "auto")  # "auto" picks cuda, then mps, then cpu
+    warm_on_startup: bool = True  # Load the index and model in the background when the PDF agent starts
+    load_timeout: float = 120.0  # Seconds a query waits for the warm-up to finish
+    load_retry_after: float = 60.0  # Seconds after a failed load before another is attempted
+    k: int = 12
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    # Search-time settings for approximate indexes built with json_to_index --index-type
+    nprobe: int = 16  # IVF lists scanned per query
+    ef_search: int = 64  # HNSW candidate list size
+
+@dataclass
+class ArticleConfig:
+    enabled: bool = True  # Deep-read the top search results instead of relying on snippets
+    top_n: int = 3
+    workers: int = 6
+    max_bytes: int = 1024 * 1024  # Per page
+    page_timeout: float = 4.0  # Read timeout and download time limit per page
+    total_timeout: float = 6.0  # For the whole deep-read stage
+    max_chars_per_article: int = 1500  # Passage text passed to the web agent prompt
+    max_stored_chars: int = 50000
+    cache_ttl: float = 6 * 3600
+    failure_ttl: float = 10 * 60
+    memory_entries: int = 256
+    persist: bool = True
+    cache_path: str = "./data/cache/article_cache.sqlite"
+    cache_max_entries: int = 5000
+    user_agent: str = "Mozilla/5.0 (compatible; ExpertAgentReader/1.0)"
+
+@dataclass
+class HTTPConfig:
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    retries: int = 3
+    backoff: float = 0.5  # Seconds before the first retry, doubling each attempt
+    max_backoff: float = 10.0
 
 class Config:
     model_config = ModelConfig()
     api_config = APIConfig()
-    path_config = PathConfig() 
\ No newline at end of file
+    path_config = PathConfig()
+    execution_config = ExecutionConfig()
+    routing_config = RoutingConfig()
+    server_config = ServerConfig()
+    llm_cache_config = LLMCacheConfig()
+    market_cache_config = MarketDataCacheConfig()
+    search_cache_config = SearchCacheConfig()
+    rag_config = RAGConfig()
+    article_config = ArticleConfig()
+    http_config = HTTPConfig() 
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+import asyncio
+import hashlib
+import random
+import re
+import time
+
+FILLER_WORDS = [
+    "market", "volatility", "earnings", "guidance", "options", "premium", "strike",
+    "expiry", "momentum", "valuation", "liquidity", "risk", "hedge", "sector",
+    "demand", "supply", "margin", "growth", "yield", "spread", "position", "trend"
+]
+
+def render_response(prompt: str, response_tokens: int, rng: random.Random) -> str:
+    """Produce a correctly shaped answer for the prompt types the agents parse"""
+    query_match = re.search(r"^Query: (.*)$", prompt, re.MULTILINE)
+    query = query_match.group(1).strip() if query_match else ""
+
+    if "Potential Symbols:" in prompt and "VALID_SYMBOLS:" in prompt:
+        symbols = re.findall(r"'([A-Z]{1,5})'", prompt.split("Potential Symbols:")[1].split("\n")[0])
+        return "VALID_SYMBOLS: " + ", ".join(f"({symbol})" for symbol in sorted(symbols))
+
+    if "WORKFLOW:" in prompt and "agent_name ->" in prompt:
+        lowered = query.lower()
+        workflow = []
+        if re.search(r"\([A-Z]{1,5}\)|price|market cap|volume", query):
+            workflow.append("finance -> market data for the requested symbols")
+        if any(word in lowered for word in ("news", "latest", "today", "current", "analyst")):
+            workflow.append("web -> current context and news")
+        if any(word in lowered for word in ("how", "what is", "explain", "strategy", "learn")):
+            workflow.append("pdf -> background knowledge")
+        workflow = workflow or ["web -> general context"]
+        return (
+            "QUERY_TYPE: ANALYSIS\n"
+            "COMPLEXITY: INTERMEDIATE\n"
+            "WORKFLOW:\n" + "\n".join(workflow) + "\n\n"
+            "REASON: Simulated plan for offline benchmarking"
+        )
+
+    words = [rng.choice(FILLER_WORDS) for _ in range(max(response_tokens - 8, 0))]
+    return f"Simulated answer for: {query or 'the request'}. " + " ".join(words) + "."
+
+class FakeLLM(LLM):
+    """Deterministic local LLM that streams canned tokens at a configurable pace"""
+    time_to_first_token: float = 0.3
+    tokens_per_second: float = 40.0
+    jitter: float = 0.1  # Fraction of each delay added or removed at random
+    response_tokens: int = 200
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _rng(self, prompt: str) -> random.Random:
+        """Seeded per prompt so the same prompt always yields the same output"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return random.Random(f"{self.seed}:{digest}")
+
+    def _tokens(self, prompt: str, rng: random.Random) -> List[str]:
+        """Split the rendered response into streamable tokens"""
+        text = render_response(prompt, self.response_tokens, rng)
+        return re.findall(r"\s*\S+|\s+", text)
+
+    def _delay(self, rng: random.Random, index: int) -> float:
+        """Seconds to wait before emitting the token at index"""
+        base = self.time_to_first_token if index == 0 else 1.0 / self.tokens_per_second
+        return max(0.0, base * (1 + rng.uniform(-self.jitter, self.jitter)))
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        rng = self._rng(prompt)
+        for index, token in enumerate(self._tokens(prompt, rng)):
+            time.sleep(self._delay(rng, index))
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield GenerationChunk(text=token)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        rng = self._rng(prompt)
+        for index, token in enumerate(self._tokens(prompt, rng)):
+            await asyncio.sleep(self._delay(rng, index))
+            if run_manager:
+                await run_manager.on_llm_new_token(token)
+            yield GenerationChunk(text=token)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        chunks = [chunk.text async for chunk in self._astream(prompt, stop, run_manager, **kwargs)]
+        return "".join(chunks)
@@ -0,0 +1,63 @@
+from typing import List, Optional
+import hashlib
+import re
+import threading
+from utils.cache import DiskCache
+from utils.config import Config
+from utils.metrics import incr
+
+class LLMCache:
+    """Prompt-level cache of LLM responses"""
+    def __init__(self):
+        self.config = Config.llm_cache_config
+        self._store: Optional[DiskCache] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def store(self) -> DiskCache:
+        """Open the on-disk store on first use"""
+        with self._lock:
+            if self._store is None:
+                self._store = DiskCache(
+                    self.config.path,
+                    max_entries=self.config.max_entries,
+                    max_bytes=self.config.max_bytes
+                )
+            return self._store
+
+    def make_key(self, provider: str, model: str, temperature: float, prompt: str) -> str:
+        """Hash everything that determines the response"""
+        raw = "\x1f".join([provider, model, repr(temperature), prompt])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, prompt_type: str) -> Optional[float]:
+        """TTL in seconds for a prompt type, or None if it must not be cached"""
+        return self.config.ttls.get(prompt_type)
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response"""
+        response = self.store.get(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        incr("llm_cache.miss" if response is None else "llm_cache.hit")
+        return response
+
+    def set(self, key: str, response: str, ttl: float) -> None:
+        """Store a response"""
+        self.store.set(key, response, ttl)
+
+def replay(response: str, callbacks: List) -> None:
+    """Stream a cached response through the callbacks as if it were generated"""
+    handlers = [cb for cb in callbacks if hasattr(cb, "on_llm_new_token")]
+    if not handlers:
+        return
+    for token in re.findall(r"\s*\S+|\s+", response):
+        for handler in handlers:
+            handler.on_llm_new_token(token)
+
+llm_cache = LLMCache()
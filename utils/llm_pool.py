@@ -0,0 +1,66 @@
+from typing import Dict, Optional, Tuple
+import threading
+from langchain_ollama import OllamaLLM
+from langchain_groq import ChatGroq
+from utils.config import Config
+from utils.fake_llm import FakeLLM
+
+# One client per provider/model/parameters, shared by every agent in the process
+_clients: Dict[Tuple, object] = {}
+_lock = threading.Lock()
+
+def get_llm(provider: Optional[str] = None, model: Optional[str] = None,
+            temperature: Optional[float] = None):
+    """Get the shared LLM client for a configuration, creating it on first use
+
+    Clients carry no callbacks; callers pass them per call through the
+    runnable config so one client can serve many concurrent requests.
+    """
+    key = resolve_settings(provider, model, temperature)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _create_llm(*key)
+            _clients[key] = client
+        return client
+
+def resolve_settings(provider: Optional[str] = None, model: Optional[str] = None,
+                     temperature: Optional[float] = None) -> Tuple[str, str, float]:
+    """Fill in provider, model and temperature from the model config"""
+    config = Config.model_config
+    provider = provider or config.provider
+    if model is None:
+        model = config.groq_model_name if provider == "groq" else config.model_name
+    temperature = config.temperature if temperature is None else temperature
+    return provider, model, temperature
+
+def _create_llm(provider: str, model: str, temperature: float):
+    """Build a client for a provider"""
+    if provider == "groq":
+        return ChatGroq(
+            api_key=Config.model_config.groq_api_key,
+            model_name=model,
+            temperature=temperature,
+            streaming=True
+        )
+    elif provider == "ollama":
+        return OllamaLLM(
+            model=model,
+            temperature=temperature
+        )
+    elif provider == "fake":
+        config = Config.model_config
+        return FakeLLM(
+            time_to_first_token=config.fake_time_to_first_token,
+            tokens_per_second=config.fake_tokens_per_second,
+            jitter=config.fake_jitter,
+            response_tokens=config.fake_response_tokens,
+            seed=config.fake_seed
+        )
+    else:
+        raise ValueError(f"Unknown provider: {provider}")
+
+def clear_pool() -> None:
+    """Drop all shared clients, e.g. after changing provider settings"""
+    with _lock:
+        _clients.clear()
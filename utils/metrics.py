@@ -0,0 +1,231 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+import json
+import threading
+import time
+from langchain.callbacks.base import BaseCallbackHandler
+
+# Metrics of the request being processed by the current thread or task
+_current: ContextVar[Optional["RequestMetrics"]] = ContextVar("request_metrics", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class RequestMetrics:
+    """Stage timings, LLM statistics and cache counters for one request"""
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid4().hex
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.llm_calls: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Add time spent in a stage; repeated stages accumulate"""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Increment an event counter such as a cache hit"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_llm_call(self, record: dict) -> None:
+        """Record one LLM generation"""
+        with self._lock:
+            self.llm_calls.append(record)
+
+    def to_dict(self) -> dict:
+        """Snapshot as plain data"""
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "started_at": self.started_at,
+                "duration": self.duration,
+                "stages": dict(self.stages),
+                "counters": dict(self.counters),
+                "llm_calls": list(self.llm_calls)
+            }
+
+    def to_json(self) -> str:
+        """Snapshot as JSON"""
+        return json.dumps(self.to_dict(), indent=2)
+
+class _Histogram:
+    """Cumulative bucket counts in the Prometheus style"""
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+class MetricsRegistry:
+    """Process-wide aggregation of finished requests"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, _Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._listeners: List[Callable[[RequestMetrics], None]] = []
+
+    def add_listener(self, listener: Callable[[RequestMetrics], None]) -> None:
+        """Call listener with every finished request's metrics"""
+        self._listeners.append(listener)
+
+    def observe_request(self, metrics: RequestMetrics) -> None:
+        """Fold a finished request into the aggregates and notify listeners"""
+        snapshot = metrics.to_dict()
+        with self._lock:
+            self._observe("expert_agent_request_seconds", None, snapshot["duration"] or 0.0)
+            for stage, seconds in snapshot["stages"].items():
+                self._observe("expert_agent_stage_seconds", ("stage", stage), seconds)
+            for call in snapshot["llm_calls"]:
+                label = ("prompt_type", call.get("prompt_type") or "unknown")
+                if call.get("ttft") is not None:
+                    self._observe("expert_agent_llm_ttft_seconds", label, call["ttft"])
+                self._observe("expert_agent_llm_seconds", label, call["duration"])
+                self._counters["llm.completion_tokens"] = (
+                    self._counters.get("llm.completion_tokens", 0) + call["completion_tokens"]
+                )
+            for name, amount in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+        for listener in self._listeners:
+            try:
+                listener(metrics)
+            except Exception as e:
+                print(f"Metrics listener failed: {str(e)}")
+
+    def _observe(self, name: str, label: Optional[tuple], value: float) -> None:
+        key = (name, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram()
+        histogram.observe(value)
+
+    def render_prometheus(self) -> str:
+        """Render all aggregates in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._histograms})
+            for name in names:
+                lines.append(f"# TYPE {name} histogram")
+                for (hist_name, label), histogram in sorted(self._histograms.items(), key=lambda item: str(item[0])):
+                    if hist_name != name:
+                        continue
+                    base = f'{label[0]}="{label[1]}"' if label else ""
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                        labels = f'{base},le="{bound}"' if base else f'le="{bound}"'
+                        lines.append(f"{name}_bucket{{{labels}}} {count}")
+                    labels = f'{base},le="+Inf"' if base else 'le="+Inf"'
+                    lines.append(f"{name}_bucket{{{labels}}} {histogram.count}")
+                    suffix = f"{{{base}}}" if base else ""
+                    lines.append(f"{name}_sum{suffix} {histogram.total}")
+                    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+            lines.append("# TYPE expert_agent_events_total counter")
+            for event, amount in sorted(self._counters.items()):
+                lines.append(f'expert_agent_events_total{{event="{event}"}} {amount}')
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+def current() -> Optional[RequestMetrics]:
+    """Metrics of the request being processed, if any"""
+    return _current.get()
+
+@contextmanager
+def track(metrics: RequestMetrics):
+    """Collect metrics for everything run inside the block, including bound threads"""
+    token = _current.set(metrics)
+    start = time.monotonic()
+    try:
+        yield metrics
+    finally:
+        metrics.duration = time.monotonic() - start
+        _current.reset(token)
+        registry.observe_request(metrics)
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current request"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_stage(name, time.monotonic() - start)
+
+def incr(name: str, amount: int = 1) -> None:
+    """Count an event against the current request"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.incr(name, amount)
+
+def bind(fn: Callable) -> Callable:
+    """Carry the current request's metrics into a thread pool task"""
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+class MetricsHandler(BaseCallbackHandler):
+    """Measures time to first token, throughput and sizes of each LLM call"""
+    def __init__(self, metrics: RequestMetrics, prompt_type: Optional[str] = None):
+        self.metrics = metrics
+        self.prompt_type = prompt_type
+        self._runs: Dict = {}
+
+    def _start(self, run_id, prompt_chars: int) -> None:
+        self._runs[run_id] = {
+            "start": time.monotonic(),
+            "first_token": None,
+            "tokens": 0,
+            "completion_chars": 0,
+            "prompt_chars": prompt_chars
+        }
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id, sum(len(prompt) for prompt in prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id, sum(len(str(m.content)) for batch in messages for m in batch))
+
+    def on_llm_new_token(self, token: str, *, run_id=None, **kwargs) -> None:
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        if run["first_token"] is None:
+            run["first_token"] = time.monotonic()
+        run["tokens"] += 1
+        run["completion_chars"] += len(token)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        end = time.monotonic()
+        completion_chars = run["completion_chars"] or sum(
+            len(generation.text) for generations in response.generations for generation in generations
+        )
+        generating = end - run["first_token"] if run["first_token"] else None
+        self.metrics.add_llm_call({
+            "prompt_type": self.prompt_type,
+            "duration": end - run["start"],
+            "ttft": run["first_token"] - run["start"] if run["first_token"] else None,
+            "completion_tokens": run["tokens"],
+            "tokens_per_second": run["tokens"] / generating if generating else None,
+            "prompt_chars": run["prompt_chars"],
+            "completion_chars": completion_chars
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._runs.pop(run_id, None)
+        self.metrics.incr("llm.error")
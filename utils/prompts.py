@@ -85,12 +85,15 @@ REASON: Brief explanation of workflow strategy and required depth"""
 )
 
 WEB_AGENT_PROMPT = PromptTemplate(
-    input_variables=["search_results", "query"],
+    input_variables=["search_results", "articles", "query"],
     template="""You are an expert web information analyst specializing in real-time financial and market data extraction and synthesis.
 
 Search Results:
 {search_results}
 
+Article Excerpts (main text from the top results):
+{articles}
+
 Query: {query}
 
 Provide a comprehensive analysis following this structure:
@@ -103,7 +106,7 @@ SOURCE EVALUATION:
 KEY FINDINGS:
 - Main Facts: List the most important discoveries
 - Market Sentiment: Overall market feeling/direction
-- Supporting Data: Key statistics or quotes
+- Supporting Data: Key statistics or quotes, preferring the article excerpts over snippets
 
 FINAL RESPONSE:
 Provide a clear, natural language summary that directly answers the query while incorporating the above analysis.
@@ -224,14 +227,19 @@ Remember:
 Keep your response clear, comprehensive, and focused on providing value to the user.""")
 
 FINANCE_AGENT_PROMPT = PromptTemplate(
-    input_variables=["market_data", "query"],
+    input_variables=["market_data", "indicators", "query"],
     template="""You are an expert financial analyst specializing in stock market analysis and interpretation.
 
 Market Data:
 {market_data}
 
+Price History Indicators (computed from daily closes; returns and drawdowns are fractions):
+{indicators}
+
 Query: {query}
 
+Symbols marked "stale" carry delayed prices; mention their data_age_minutes when quoting them. Symbols with an "error" could not be fetched; say so briefly rather than guessing.
+
 Analyze the provided market data and structure your response as follows:
 
 MARKET ANALYSIS:
@@ -240,7 +248,8 @@ MARKET ANALYSIS:
 - Market Context: Broader market conditions
 
 TECHNICAL ASSESSMENT:
-- Price Levels: Support/resistance if relevant
+- Price Levels: Support/resistance and moving averages if relevant
+- Trend and Risk: RSI, volatility, drawdowns and correlations from the indicators
 - Volume Analysis: Trading activity insights
 - Pattern Recognition: Notable chart patterns
 
@@ -0,0 +1,87 @@
+from concurrent.futures import CancelledError, Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import threading
+from utils import metrics
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call
+
+    The first caller for a key runs the fetch; callers arriving while it is
+    in flight wait for it and share its result or exception. Sync and async
+    callers share flights, so a thread can wait on a fetch started by a task
+    and vice versa.
+    """
+    def __init__(self):
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def _join(self, key: Hashable):
+        """Return (future, is_leader) for a key"""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._flights[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _land(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def do(self, key: Hashable, fn: Callable, *args) -> Any:
+        """Run fn(*args) unless a call for key is already in flight, then share its outcome"""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                metrics.incr("singleflight.shared")
+                try:
+                    return future.result()
+                except CancelledError:
+                    continue  # The leader was cancelled; try to lead ourselves
+
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._land(key, future)
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable], *args) -> Any:
+        """Async variant of do; fn returns an awaitable"""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                metrics.incr("singleflight.shared")
+                try:
+                    # Shield so one waiter being cancelled does not cancel the flight
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        continue
+                    raise
+
+            try:
+                result = await fn(*args)
+            except asyncio.CancelledError:
+                future.cancel()  # Waiters retry rather than inherit our cancellation
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._land(key, future)
+
+flights = SingleFlight()
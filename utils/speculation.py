@@ -0,0 +1,80 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import threading
+import time
+from utils import metrics
+from utils.config import Config
+
+class Speculator:
+    """Runs speculative tool fetches in the background until an agent claims them"""
+    def __init__(self, max_workers: int, max_age: float):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending: Dict[Hashable, Tuple[Future, float]] = {}
+        self._lock = threading.Lock()
+        self.max_age = max_age
+        self.started = 0
+        self.claimed = 0
+        self.dropped = 0
+
+    def submit(self, key: Hashable, fn: Callable, *args) -> None:
+        """Start a fetch for a key unless one is already in flight"""
+        with self._lock:
+            self._expire()
+            if key in self._pending:
+                return
+            self._pending[key] = (self._executor.submit(metrics.bind(fn), *args), time.monotonic())
+            self.started += 1
+
+    def claim(self, key: Hashable) -> Optional[Any]:
+        """Take a speculative result, waiting for it if still running
+
+        Returns None when nothing was speculated, the fetch was started more
+        than max_age ago, or it failed, so the caller falls back to fetching
+        normally.
+        """
+        entry = self._take(key)
+        if entry is None:
+            return None
+
+        try:
+            result = entry[0].result()
+        except Exception:
+            return None
+        with self._lock:
+            self.claimed += 1
+        metrics.incr("prefetch.claimed")
+        return result
+
+    async def aclaim(self, key: Hashable) -> Optional[Any]:
+        """Async variant of claim that waits without blocking the event loop"""
+        entry = self._take(key)
+        if entry is None:
+            return None
+
+        try:
+            result = await asyncio.wrap_future(entry[0])
+        except Exception:
+            return None
+        with self._lock:
+            self.claimed += 1
+        metrics.incr("prefetch.claimed")
+        return result
+
+    def _take(self, key: Hashable) -> Optional[Tuple[Future, float]]:
+        """Remove and return a key's fetch unless it is older than max_age"""
+        with self._lock:
+            self._expire()
+            return self._pending.pop(key, None)
+
+    def _expire(self) -> None:
+        """Drop unclaimed fetches; their results stay in the tool caches"""
+        cutoff = time.monotonic() - self.max_age
+        for key in [k for k, (_, started) in self._pending.items() if started < cutoff]:
+            del self._pending[key]
+            self.dropped += 1
+
+speculator = Speculator(
+    max_workers=Config.execution_config.prefetch_workers,
+    max_age=Config.execution_config.prefetch_max_age
+)